@@ -0,0 +1,130 @@
+# bench/bench_cleaner.py
+# 对比旧的清理流程（extract_clean_body 多次 XPath 扫描 + compress_html 正则去重）与单次遍历的 HtmlCleaner，
+# 以及旧 compress_html 与 compress_links（整页输出）
+#   python bench/bench_cleaner.py [--rounds 20] [--links 2000] [--dups 500]
+import argparse
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import html
+from service.html_cleaner import clean_body, compress_links
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = [os.path.join(ROOT, "doc", "chapter.html"), os.path.join(ROOT, "doc", "content.html")]
+
+
+def legacy_clean_body(html_content: str) -> str:
+    """旧 CrawlService.extract_clean_body"""
+    parser = html.HTMLParser(recover=True, encoding="utf-8")
+    tree = html.fromstring(html_content, parser=parser)
+    body = tree.xpath("//body")[0]
+    for tag in ["script", "style", "link", "meta", "noscript", "input"]:
+        for e in body.xpath(f".//{tag}"):
+            if e.getparent() is not None:
+                e.getparent().remove(e)
+    for comment in body.xpath("//comment()"):
+        if comment.getparent() is not None:
+            comment.getparent().remove(comment)
+    for selector in [
+        '//*[contains(@class, "footer")]',
+        '//*[contains(@class, "header")]',
+        '//*[contains(@class, "nav")]',
+        '//*[contains(@id, "footer")]',
+        '//*[contains(@id, "header")]',
+        '//*[contains(@id, "nav")]',
+    ]:
+        for e in body.xpath(selector):
+            if e.getparent() is not None:
+                e.getparent().remove(e)
+    content = "".join(html.tostring(child, encoding="unicode", method="html") for child in body.getchildren())
+    content = re.sub(r">\s*\n\s*<", "><", content)
+    content = re.sub(r">\s{2,}<", "><", content)
+    return content.strip()
+
+
+def legacy_compress_html(html_content: str) -> str:
+    """旧 NovelService.compress_html"""
+    container_pattern = r'(<div[^>]*>.*?</div>|<ul[^>]*>.*?</ul>|<ol[^>]*>.*?</ol>|<nav[^>]*>.*?</nav>|<section[^>]*>.*?</section>|<article[^>]*>.*?</article>)'
+
+    def remove_duplicate_links(match):
+        container_html = match.group(0)
+        link_pattern = r'(<a\s+[^>]*href=([\'"])(.*?)\2[^>]*>.*?</a>)'
+        links = re.findall(link_pattern, container_html, re.DOTALL)
+        href_count = defaultdict(int)
+        href_first_occurrence = {}
+        for i, (full_match, quote, href) in enumerate(links):
+            href_count[href] += 1
+            if href not in href_first_occurrence:
+                href_first_occurrence[href] = (full_match, i)
+        new_container = container_html
+        for href, count in sorted(href_count.items(), key=lambda x: -x[1]):
+            if count > 1:
+                all_occurrences = [m.start() for m in re.finditer(re.escape(href_first_occurrence[href][0]), new_container)]
+                for i, pos in enumerate(all_occurrences):
+                    if i > 0:
+                        link_match = re.search(r'<a\s+[^>]*>.*?</a>', new_container[pos:], re.DOTALL)
+                        if link_match:
+                            link_text_match = re.search(r'>([^<]*)</a>', link_match.group(0))
+                            if link_text_match:
+                                link_text = link_text_match.group(1)
+                                new_container = new_container[:pos] + link_text + new_container[pos + len(link_match.group(0)):]
+        return new_container
+
+    return re.sub(container_pattern, remove_duplicate_links, html_content, flags=re.DOTALL)
+
+
+def synthetic_directory(links: int, dups: int) -> str:
+    """大目录页：完整章节列表前面再放 dups 条“最新章节”（链接重复），外加页眉页脚与脚本"""
+    rows = "".join(f'<dd><a href="/book/{i}.html">第{i}章 标题</a></dd>\n' for i in range(links))
+    latest = "".join(f'<dd><a href="/book/{i}.html">第{i}章 标题</a></dd>\n' for i in range(links - dups, links))
+    return (
+        '<html><head><title>目录</title><script>var a=1;</script></head><body>'
+        '<div class="header"><a href="/">首页</a></div><!-- ad -->'
+        f'<div class="listmain"><dl><dt>最新章节</dt>{latest}<dt>正文</dt>{rows}</dl></div>'
+        '<div id="footer">footer</div></body></html>'
+    )
+
+
+def timeit(func, arg, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(arg)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--links", type=int, default=2000)
+    parser.add_argument("--dups", type=int, default=500)
+    args = parser.parse_args()
+
+    samples = []
+    for path in PAGES:
+        with open(path, "r", encoding="utf-8") as f:
+            samples.append((os.path.basename(path), f.read()))
+    samples.append((f"synthetic-{args.links}/{args.dups}", synthetic_directory(args.links, args.dups)))
+
+    print(f"{'page':<18}{'size':>9}{'legacy ms':>12}{'cleaner ms':>12}{'speedup':>9}  same")
+    for name, page in samples:
+        legacy = lambda s: legacy_compress_html(legacy_clean_body(s))
+        same = legacy(page) == clean_body(page)
+        t_old = timeit(legacy, page, args.rounds)
+        t_new = timeit(clean_body, page, args.rounds)
+        print(f"{name:<18}{len(page):>9}{t_old:>12.2f}{t_new:>12.2f}{t_old / t_new:>8.1f}x  {same}")
+
+    print(f"\n{'compress':<18}{'size':>9}{'legacy ms':>12}{'links ms':>12}{'speedup':>9}  same")
+    for name, page in samples:
+        same = legacy_compress_html(page) == compress_links(page)
+        t_old = timeit(legacy_compress_html, page, args.rounds)
+        t_new = timeit(compress_links, page, args.rounds)
+        print(f"{name:<18}{len(page):>9}{t_old:>12.2f}{t_new:>12.2f}{t_old / t_new:>8.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
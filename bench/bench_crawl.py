@@ -0,0 +1,202 @@
+# bench/bench_crawl.py
+# 离线全流程基准：本地替身站（bench/standin_site.py）上跑 小说信息 -> 目录 -> 整本下载，
+# 输出章节/秒、单章耗时 p50/p99、每页解析耗时与峰值 RSS，用于对比 RequestManager / NovelService 的改动
+# --transport 可给多个传输层（aiohttp httpx），依次在同一替身站上跑，结果并排输出
+# 替身站只支持 HTTP/1.1 明文，httpx 在这里比较的是客户端开销，HTTP/2 多路复用的收益需对真实 HTTPS 站点测量
+#   python bench/bench_crawl.py [--chapters 200] [--pages 3] [--latency 0.02] [--jitter 0.01]
+#                               [--encoding gbk] [--config-encoding gbk] [--throttle-rps 300] [--concurrency 16]
+#                               [--transport aiohttp httpx] [--storage store] [--json]
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+from bench.standin_site import SiteOptions, StandinServer, site_config
+from service.chapter_store import ChapterStore
+from service.config_service import ConfigRegistry
+from service.http_cache import HttpCache
+from service.novel_service import NovelService
+from service.parse_pool import ParsePool
+from service.session_manager import SessionManager
+from service.telemetry import Metrics, setup_logging
+from service.transport import TRANSPORTS
+
+
+class TimedNovelService(NovelService):
+    """记录每章（含全部子页）的抓取耗时原始值（Metrics 直方图只能给出分桶估算的分位数）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chapter_times = []
+        self.empty_chapters = 0
+
+    async def fetch_chapter_content(self, url: str):
+        start = time.perf_counter()
+        try:
+            data = await super().fetch_chapter_content(url)
+        finally:
+            self.chapter_times.append(time.perf_counter() - start)
+        if not data or not data.get("content"):
+            self.empty_chapters += 1
+        return data
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def run_flow(server: StandinServer, args, workdir: str, transport: str) -> dict:
+    config_dir = os.path.join(workdir, "config")
+    os.makedirs(config_dir)
+    config = site_config(server.base_url, args.config_encoding, args.delay)
+    # 通过站点配置选择传输层，与实际使用路径一致
+    config["site"]["transport"] = transport
+    with open(os.path.join(config_dir, "127.0.0.1.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+    metrics = Metrics.get_instance()
+    metrics.reset()
+    parse_pool = ParsePool(mode=args.parse_mode)
+    session_manager = SessionManager()
+    service = TimedNovelService(
+        server.index_url,
+        session_manager=session_manager,
+        max_concurrent=args.max_concurrent,
+        cache=HttpCache(cache_dir=os.path.join(workdir, "cache")),
+        registry=ConfigRegistry(config_dir=config_dir),
+        parse_pool=parse_pool,
+    )
+    # download_novel 写入 ./output，切到临时目录，不污染仓库
+    os.chdir(workdir)
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        info = await service.fetch_novel_info(server.index_url)
+        timings["info"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chapters = await service.fetch_chapter_list(server.index_url)
+        timings["directory"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        file_path = await service.download_novel("standin", "bench", chapters, concurrency=args.concurrency,
+                                                 storage=args.storage)
+        timings["download"] = time.perf_counter() - start
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{server.base_url}_stats") as resp:
+                server_stats = await resp.json()
+        session_stats = session_manager.get_stats()
+    finally:
+        await service.close()
+        await session_manager.close()
+        parse_pool.close()
+
+    output_bytes = os.path.getsize(file_path)
+    if args.storage == "store":
+        with ChapterStore(file_path) as store:
+            output_chars = len(store.meta().get("header", ""))
+            output_chars += sum(len(chapter["text"]) for chapter in store.iter_chapters())
+    else:
+        with open(file_path, "r", encoding="utf-8") as f:
+            output_chars = len(f.read())
+    if args.metrics_out:
+        metrics.export(args.metrics_out)
+    parse_times = metrics.histograms.get("parse_seconds", {}).values()
+    parse_count = sum(h.count for h in parse_times)
+    parse_sum = sum(h.sum for h in parse_times)
+    host = "127.0.0.1"
+    return {
+        "transport": transport,
+        "title": info.get("title", ""),
+        "chapters": len(chapters),
+        "downloaded": len(service.chapter_times) - service.empty_chapters,
+        "output_chars": output_chars,
+        "output_bytes": output_bytes,
+        "info_s": round(timings["info"], 3),
+        "directory_s": round(timings["directory"], 3),
+        "download_s": round(timings["download"], 3),
+        "chapters_per_s": round(len(chapters) / timings["download"], 1) if timings["download"] else 0.0,
+        "chapter_p50_ms": round(percentile(service.chapter_times, 50) * 1000, 1),
+        "chapter_p99_ms": round(percentile(service.chapter_times, 99) * 1000, 1),
+        "parse_ms_per_page": round(parse_sum / max(parse_count, 1) * 1000, 2),
+        "pages_parsed": parse_count,
+        "client_requests": sum(metrics.counters.get("http_requests_total", {}).values()),
+        "client_retries": metrics.counter("http_retries_total", host=host),
+        "bytes_received": metrics.counter("http_response_bytes_total", host=host),
+        "http2_responses": session_stats["http2_responses"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "server_requests": server_stats["requests"],
+        "server_429": server_stats["throttled"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=3, help="每章子页数")
+    parser.add_argument("--paragraphs", type=int, default=30, help="每个子页的段落数")
+    parser.add_argument("--latency", type=float, default=0.02, help="服务端固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="服务端随机延迟上限（秒）")
+    parser.add_argument("--encoding", default="utf-8", choices=("utf-8", "gbk"), help="替身站页面编码")
+    parser.add_argument("--config-encoding", help="写入站点配置的 site.encoding，缺省不写，由响应头 / <meta> 判定")
+    parser.add_argument("--throttle-rps", type=float, default=0.0, help="服务端每秒请求上限，超出返回 429")
+    parser.add_argument("--delay", type=float, default=0.0, help="站点配置 site.delay")
+    parser.add_argument("--concurrency", type=int, default=16, help="下载引擎并发章节数")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="RequestManager 并发请求数")
+    parser.add_argument("--parse-mode", default="thread", choices=ParsePool.MODES)
+    parser.add_argument("--storage", default="txt", choices=NovelService.STORAGE_BACKENDS, help="输出后端")
+    parser.add_argument("--transport", nargs="+", default=["aiohttp"], choices=list(TRANSPORTS),
+                        help="传输层，可给多个依次对比")
+    parser.add_argument("--verbose", action="store_true", help="输出 DEBUG 日志（每个子页的抓取过程）")
+    parser.add_argument("--metrics-out", help="导出指标：.prom 为 Prometheus 文本，其余追加一行 JSON")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+    setup_logging("DEBUG" if args.verbose else "WARNING")
+    if args.metrics_out:
+        args.metrics_out = os.path.abspath(args.metrics_out)
+
+    options = SiteOptions(chapters=args.chapters, pages=args.pages, paragraphs=args.paragraphs,
+                          latency=args.latency, jitter=args.jitter, encoding=args.encoding,
+                          throttle_rps=args.throttle_rps)
+    cwd = os.getcwd()
+    results = []
+    for transport in args.transport:
+        # 每个传输层用新的替身站与临时目录，服务端计数与 HTTP 缓存互不影响
+        with StandinServer(options) as server, tempfile.TemporaryDirectory(prefix="bench_crawl_") as workdir:
+            try:
+                results.append(asyncio.run(run_flow(server, args, workdir, transport)))
+            finally:
+                os.chdir(cwd)
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+        return
+    print(f"站点: {args.chapters} 章 × {args.pages} 页，延迟 {args.latency}+{args.jitter}s，"
+          f"编码 {args.encoding}，限流 {args.throttle_rps or '无'} rps")
+    width = max(len(k) for k in results[0])
+    for key in results[0]:
+        print(f"  {key:<{width}}  " + "  ".join(f"{str(r[key]):>14}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench/bench_extraction.py
+# 对比逐页解析 XPath 字符串（parsel）与预编译抽取计划（ExtractionPlan）的单页耗时
+#   python bench/bench_extraction.py [--rounds 200]
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsel import Selector
+from service.extraction_plan import ExtractionPlan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "config", "www.cansy.cn.json")
+CHAPTER_PAGE = os.path.join(ROOT, "doc", "chapter.html")
+CONTENT_PAGE = os.path.join(ROOT, "doc", "content.html")
+
+
+def legacy_content(body: bytes, cfg: dict):
+    """旧路径：解码为 str -> parsel -> 每次解析 XPath 字符串，容器求值两次"""
+    sel = Selector(body.decode("utf-8"))
+    content_cfg = cfg["content"]
+    title = sel.xpath(content_cfg["container"]).xpath(content_cfg["title"]).get(default="").strip()
+    paragraphs = sel.xpath(content_cfg["container"]).xpath(content_cfg["text"]).getall()
+    next_page = sel.xpath(content_cfg["next_page"]).get()
+    return title, paragraphs, next_page
+
+
+def legacy_chapters(body: bytes, cfg: dict):
+    sel = Selector(body.decode("utf-8"))
+    chapters_cfg = cfg["chapters"]
+    chapters = []
+    for container in sel.xpath(chapters_cfg["container"]):
+        for a in container.xpath(chapters_cfg["item"]):
+            title = "".join(a.xpath(chapters_cfg["title"]).getall()).strip()
+            href = a.xpath(chapters_cfg["url"]).get(default="").strip()
+            if title and href:
+                chapters.append({"title": title, "url": href})
+    return chapters
+
+
+def planned_content(body: bytes, plan: ExtractionPlan):
+    return plan.extract_content(ExtractionPlan.parse(body, "utf-8"))
+
+
+def planned_chapters(body: bytes, plan: ExtractionPlan):
+    return plan.extract_chapters(ExtractionPlan.parse(body, "utf-8"))
+
+
+def timeit(func, rounds: int, *args) -> float:
+    func(*args)  # 预热
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    with open(CHAPTER_PAGE, "rb") as f:
+        chapter_body = f.read()
+    with open(CONTENT_PAGE, "rb") as f:
+        content_body = f.read()
+
+    start = time.perf_counter()
+    plan = ExtractionPlan(cfg)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    rows = [
+        ("content.html", timeit(legacy_content, args.rounds, content_body, cfg),
+         timeit(planned_content, args.rounds, content_body, plan)),
+        ("chapter.html", timeit(legacy_chapters, args.rounds, chapter_body, cfg),
+         timeit(planned_chapters, args.rounds, chapter_body, plan)),
+    ]
+
+    print(f"抽取计划编译耗时: {compile_ms:.3f} ms（每站点一次）")
+    print(f"{'页面':<14}{'parsel(ms/页)':>16}{'plan(ms/页)':>14}{'加速比':>8}")
+    for name, before, after in rows:
+        print(f"{name:<14}{before:>16.3f}{after:>14.3f}{before / after:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
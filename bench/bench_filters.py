@@ -0,0 +1,72 @@
+# bench/bench_filters.py
+# 对比逐段逐规则子串匹配与 ContentFilter 一次扫描的过滤耗时（doc/content.html）
+#   python bench/bench_filters.py [--rounds 500] [--extra-rules 200]
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.config_service import read_config_file
+from service.content_filter import ContentFilter, ahocorasick
+from service.extraction_plan import ExtractionPlan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTENT_CONFIG = os.path.join(ROOT, "config", "www.cansy.cn.json")
+FILTER_CONFIG = os.path.join(ROOT, "config", "www.bqg116.com.yaml")
+CONTENT_PAGE = os.path.join(ROOT, "doc", "content.html")
+
+
+def legacy_filter(paragraphs, rules):
+    """旧实现：每段对每条规则做一次子串判断（正则规则永远不会命中）"""
+    result = []
+    for p in paragraphs:
+        p = p.strip()
+        if p and not any(f in p for f in rules):
+            result.append(p)
+    return result
+
+
+def timeit(func, rounds: int, *args) -> float:
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--extra-rules", type=int, default=200, help="额外追加的关键字规则数，模拟规则较多的站点")
+    args = parser.parse_args()
+
+    with open(CONTENT_CONFIG, "r", encoding="utf-8") as f:
+        content_cfg = json.load(f)
+    filters = read_config_file(FILTER_CONFIG)["filters"]
+    with open(CONTENT_PAGE, "rb") as f:
+        body = f.read()
+
+    # 只取未过滤的原始段落作为输入
+    plan = ExtractionPlan({"content": content_cfg["content"]})
+    paragraphs = plan.extract_content(ExtractionPlan.parse(body))["paragraphs"] * 10
+
+    print(f"段落数: {len(paragraphs)}，Aho-Corasick: {'pyahocorasick' if ahocorasick else '未安装，使用合并正则'}")
+    print(f"{'规则数':<10}{'子串循环(ms)':>14}{'ContentFilter(ms)':>20}{'加速比':>8}")
+    for rules in (filters["regex"], filters["regex"] + [f"推广关键字{i}" for i in range(args.extra_rules)]):
+        engine = ContentFilter({"regex": rules})
+        before = timeit(legacy_filter, args.rounds, paragraphs, rules)
+        after = timeit(engine.filter_paragraphs, args.rounds, paragraphs)
+        print(f"{len(rules):<10}{before:>14.3f}{after:>20.3f}{before / after:>8.2f}x")
+
+    # remove_html 一次联合查询的耗时（含解析）
+    engine = ContentFilter(filters)
+    parse_ms = timeit(ExtractionPlan.parse, args.rounds // 5 or 1, body)
+    clean_ms = timeit(lambda: engine.clean_tree(ExtractionPlan.parse(body)), args.rounds // 5 or 1)
+    print(f"remove_html {len(filters['remove_html'])} 条规则单次删除: {clean_ms - parse_ms:.3f} ms/页（不含解析）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench/bench_parse_pool.py
+# 解析工作池在不同模式、不同工作数下的吞吐（页/秒），样本为 doc/ 下的目录页与正文页
+#   python bench/bench_parse_pool.py [--pages 400] [--workers 1,2,4,8]
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.extraction_plan import ExtractionPlan
+from service.parse_pool import ParsePool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "config", "www.cansy.cn.json")
+CHAPTER_PAGE = os.path.join(ROOT, "doc", "chapter.html")
+CONTENT_PAGE = os.path.join(ROOT, "doc", "content.html")
+
+
+async def run_pages(pool: ParsePool, pages: int, chapter_body: bytes, content_body: bytes,
+                    plan: ExtractionPlan) -> float:
+    """模拟下载中的解析负载：每 20 个正文页夹带 1 个目录页，全部并发提交"""
+    jobs = []
+    for i in range(pages):
+        if i % 20 == 0:
+            jobs.append(pool.extract_chapters(chapter_body, "utf-8", plan, "https://www.cansy.cn/139095/"))
+        else:
+            jobs.append(pool.extract_content(content_body, "utf-8", plan))
+    start = time.perf_counter()
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+    assert all(results), "存在解析失败的页面"
+    return elapsed
+
+
+async def bench(mode: str, workers: int, pages: int, bodies, plan: ExtractionPlan) -> float:
+    pool = ParsePool(mode=mode, max_workers=workers)
+    try:
+        # 预热：线程/进程启动与每个工作者内的抽取计划编译不计入耗时
+        await run_pages(pool, workers * 4, *bodies, plan)
+        return await run_pages(pool, pages, *bodies, plan)
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        plan = ExtractionPlan.for_config(json.load(f))
+    with open(CHAPTER_PAGE, "rb") as f:
+        chapter_body = f.read()
+    with open(CONTENT_PAGE, "rb") as f:
+        content_body = f.read()
+    bodies = (chapter_body, content_body)
+    worker_counts = [int(n) for n in args.workers.split(",") if n.strip()]
+
+    print(f"CPU 核数: {os.cpu_count()}，页面数: {args.pages}")
+    baseline = asyncio.run(bench("inline", 1, args.pages, bodies, plan))
+    print(f"{'inline':>8} {'-':>3}  {args.pages / baseline:8.1f} 页/秒  x1.00")
+    for mode in ("thread", "process"):
+        for workers in worker_counts:
+            elapsed = asyncio.run(bench(mode, workers, args.pages, bodies, plan))
+            print(f"{mode:>8} {workers:>3}  {args.pages / elapsed:8.1f} 页/秒  x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
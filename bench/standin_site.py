@@ -0,0 +1,245 @@
+# bench/standin_site.py
+# 本地替身小说站：用 doc/chapter.html、doc/content.html 作模板生成一本合成小说，供离线基准测试使用
+#   目录页  /book/            —— N 个 <dd><a href="/book/{id}.html">第i章 …</a></dd>
+#   正文页  /book/{id}.html   —— 第 1 页；/book/{id}_{k}.html 为第 k 个子页，a#next_page 指向下一子页或下一章
+# 可配置：章节数、每章子页数、每段落数、响应延迟与抖动、GBK 编码、超过每秒请求数时返回 429
+#   python bench/standin_site.py [--chapters 200] [--pages 3] [--port 8080]
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from aiohttp import web
+from lxml import etree, html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAPTER_TEMPLATE = os.path.join(ROOT, "doc", "chapter.html")
+CONTENT_TEMPLATE = os.path.join(ROOT, "doc", "content.html")
+CONFIG_TEMPLATE = os.path.join(ROOT, "config", "www.cansy.cn.json")
+
+FIRST_CHAPTER_ID = 100001   # 章节编号取较大的数，避免“本章编号是下一章链接子串”的误判
+_CHARSET_RE = re.compile(r'<meta charset="[^"]*"', re.IGNORECASE)
+
+
+@dataclass
+class SiteOptions:
+    chapters: int = 200
+    pages: int = 3              # 每章子页数（含第 1 页）
+    paragraphs: int = 30        # 每个子页的段落数
+    latency: float = 0.0        # 每个响应的固定延迟（秒）
+    jitter: float = 0.0         # 额外随机延迟上限（秒）
+    encoding: str = "utf-8"     # utf-8 / gbk
+    throttle_rps: float = 0.0   # 最近 1 秒内请求数超过该值返回 429（0 表示不限）
+    retry_after: int = 1
+
+
+class StandinSite:
+    """合成小说站：模板在启动时处理一次，每个请求只做字符串替换和编码"""
+
+    def __init__(self, options: SiteOptions):
+        self.options = options
+        self.stats = {"requests": 0, "throttled": 0, "not_found": 0}
+        self._recent = deque()
+        self._index_page = self._build_index()
+        self._content_template, self._sample_paragraphs = self._build_content_template()
+
+    # ---------- 模板 ----------
+
+    def _charset(self, page: str) -> str:
+        return _CHARSET_RE.sub(f'<meta charset="{self.options.encoding}"', page, count=1)
+
+    @staticmethod
+    def chapter_id(index: int) -> int:
+        return FIRST_CHAPTER_ID + index
+
+    def _build_index(self) -> str:
+        with open(CHAPTER_TEMPLATE, "r", encoding="utf-8") as f:
+            tree = html.document_fromstring(f.read())
+        dl = tree.xpath("//div[@class='listmain']/dl")[0]
+        for dd in dl.findall("dd"):
+            dl.remove(dd)
+        for i in range(self.options.chapters):
+            dd = etree.SubElement(dl, "dd")
+            a = etree.SubElement(dd, "a", href=f"/book/{self.chapter_id(i)}.html")
+            a.text = f"第{i + 1}章 合成章节{i + 1}"
+        return self._charset(html.tostring(tree, encoding="unicode", doctype="<!DOCTYPE html>"))
+
+    def _build_content_template(self):
+        with open(CONTENT_TEMPLATE, "r", encoding="utf-8") as f:
+            tree = html.document_fromstring(f.read())
+        bodybox = tree.xpath("//div[@id='bodybox']")[0]
+        paragraphs = [p.text_content().strip() for p in bodybox.findall("p") if p.text_content().strip()]
+        for p in bodybox.findall("p"):
+            bodybox.remove(p)
+        bodybox.text = "@@BODY@@"
+        for h1 in tree.xpath("//div[@class='content']/h1"):
+            h1.text = "@@TITLE@@"
+        for a in tree.xpath("//a[@id='next_page']"):
+            a.set("href", "@@NEXT@@")
+        page = html.tostring(tree, encoding="unicode", doctype="<!DOCTYPE html>")
+        return self._charset(page), paragraphs
+
+    def render_content(self, index: int, page_no: int) -> str:
+        opts = self.options
+        cid = self.chapter_id(index)
+        if page_no < opts.pages:
+            next_url = f"/book/{cid}_{page_no + 1}.html"
+        else:
+            next_url = f"/book/{self.chapter_id(index + 1)}.html"
+        start = (index * opts.pages + page_no) * opts.paragraphs
+        sample = self._sample_paragraphs
+        body = "".join(
+            f"<p>{sample[(start + k) % len(sample)]}</p>" for k in range(opts.paragraphs)
+        )
+        title = f"第{index + 1}章 合成章节{index + 1}" + (f"（{page_no}/{opts.pages}）" if opts.pages > 1 else "")
+        return (self._content_template
+                .replace("@@BODY@@", body)
+                .replace("@@TITLE@@", title)
+                .replace("@@NEXT@@", next_url))
+
+    # ---------- 请求处理 ----------
+
+    def _throttled(self) -> bool:
+        rps = self.options.throttle_rps
+        if rps <= 0:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= rps:
+            return True
+        self._recent.append(now)
+        return False
+
+    def _respond(self, page: str) -> web.Response:
+        body = page.encode(self.options.encoding, errors="replace")
+        return web.Response(body=body, content_type="text/html", charset=self.options.encoding)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        opts = self.options
+        if opts.latency or opts.jitter:
+            await asyncio.sleep(opts.latency + random.uniform(0, opts.jitter))
+        if self._throttled():
+            self.stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(opts.retry_after)})
+
+        path = request.path
+        if path in ("/book/", "/book"):
+            return self._respond(self._index_page)
+        match = re.fullmatch(r"/book/(\d+)(?:_(\d+))?\.html", path)
+        if match:
+            index = int(match.group(1)) - FIRST_CHAPTER_ID
+            page_no = int(match.group(2) or 1)
+            if 0 <= index < opts.chapters and 1 <= page_no <= opts.pages:
+                return self._respond(self.render_content(index, page_no))
+        self.stats["not_found"] += 1
+        raise web.HTTPNotFound()
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_get("/{tail:.*}", self.handle)
+        return app
+
+
+# ---------- 站点配置 ----------
+
+def site_config(base_url: str, encoding: Optional[str] = None, delay: float = 0.0) -> dict:
+    """
+    基于 www.cansy.cn 的规则生成替身站配置（模板页面结构与其相同）
+    encoding 为 None 时配置中不写编码，由客户端按响应头与 <meta charset> 判定
+    """
+    with open(CONFIG_TEMPLATE, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config["site"].update({"name": "standin", "base_url": base_url, "delay": delay})
+    if encoding:
+        config["site"]["encoding"] = encoding
+    else:
+        config["site"].pop("encoding", None)
+    return config
+
+
+# ---------- 独立进程运行 ----------
+
+def _serve(options: dict, port: int, ready):
+    site = StandinSite(SiteOptions(**options))
+
+    async def main():
+        runner = web.AppRunner(site.app(), access_log=None)
+        await runner.setup()
+        tcp = web.TCPSite(runner, "127.0.0.1", port)
+        await tcp.start()
+        ready.put(tcp._server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+class StandinServer:
+    """在子进程中运行替身站，基准测试进程的 CPU 与内存统计不受服务端影响"""
+
+    def __init__(self, options: SiteOptions, port: int = 0):
+        self.options = options
+        self.port = port
+        self._process = None
+
+    def __enter__(self) -> "StandinServer":
+        ready = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, args=(asdict(self.options), self.port, ready),
+                                                daemon=True)
+        self._process.start()
+        while True:
+            try:
+                self.port = ready.get(timeout=0.5)
+                return self
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError("替身站进程启动失败")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/"
+
+    @property
+    def index_url(self) -> str:
+        return f"{self.base_url}book/"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--throttle-rps", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    options = SiteOptions(chapters=args.chapters, pages=args.pages, paragraphs=args.paragraphs,
+                          latency=args.latency, jitter=args.jitter, encoding=args.encoding,
+                          throttle_rps=args.throttle_rps)
+    print(f"替身站已启动: http://127.0.0.1:{args.port}/book/（Ctrl+C 退出）")
+    web.run_app(StandinSite(options).app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
 # main.py
 import asyncio
+import os
 import sys
 from service.novel_service import NovelService
+from service.parse_pool import ParsePool
+from service.session_manager import SessionManager
+from service.telemetry import Metrics, setup_logging
 
 # ✅ Windows 下切换事件循环策略，解决 ProactorEventLoop 异常
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 async def main():
+    # 日志级别由 LOG_LEVEL 控制（DEBUG 时输出每个子页的抓取过程）
+    setup_logging()
 
     # 测试章节列表
     url = "https://www.cansy.cn/139095/"
@@ -31,6 +37,16 @@ async def main():
     # print(f"准备下载小说《{info['title']}》的 {len(chapters)} 章")
     # await novel_service.download_novel("蛊真人", "", chapters)
 
+    # 进程结束前关闭共享连接池与解析工作池
+    await SessionManager.close_instance()
+    ParsePool.close_instance()
+
+    # METRICS_PATH 以 .prom 结尾时导出 Prometheus 文本，否则追加一行 JSON；TRACE_PATH 另存每章追踪事件
+    metrics = Metrics.get_instance()
+    if os.getenv("METRICS_PATH"):
+        metrics.export(os.getenv("METRICS_PATH"))
+    metrics.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
     
@@ -17,22 +17,25 @@ from pydantic import BaseModel, Field
 class RequestHeaders(BaseModel):
     """请求头配置模型，对应 YAML 中的 headers 节点"""
     User_Agent: Optional[str] = Field(None, alias="User-Agent")
-    Accept: Optional[str]
+    Accept: Optional[str] = None
     Accept_Language: Optional[str] = Field(None, alias="Accept-Language")
     Accept_Encoding: Optional[str] = Field(None, alias="Accept-Encoding")
-    Connection: Optional[str]
+    Connection: Optional[str] = None
     Upgrade_Insecure_Requests: Optional[str] = Field(None, alias="Upgrade-Insecure-Requests")
-    Cookie: Optional[str]
+    Cookie: Optional[str] = None
 
 
 class SiteConfig(BaseModel):
     """站点级配置信息"""
     name: str                                  # 站点代号或文件名
     base_url: str                              # 网站根地址
-    encoding: str = "utf-8"                    # 字符集
+    encoding: Optional[str] = None             # 字符集，填写后优先于响应头 / <meta> 声明；None 按页面声明判定
     user_agent: Optional[str] = None           # 浏览器标识
     delay: float = 1.0                         # 抓取延迟秒数
+    cache_ttl: Optional[float] = None          # 响应缓存有效期秒数（None 使用全局默认）
     headers: Optional[RequestHeaders] = None   # 请求头配置
+    aliases: List[str] = []                    # 镜像站 / 其他子域名，共用同一份配置
+    transport: Optional[str] = None            # 传输层：aiohttp / httpx（支持 HTTP/2 的站点），None 使用全局默认
 
 
 # ===========================================
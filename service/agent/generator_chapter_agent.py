@@ -3,16 +3,22 @@ import os
 from pydantic_ai import Agent
 
 from models.data_models import ChapterListConfig
+from service.agent.rule_agent_mixin import AsyncRuleAgentMixin
+from service.html_skeleton import HtmlSkeleton
 
 
-class XPathGeneratorChapterAgent:
+class XPathGeneratorChapterAgent(AsyncRuleAgentMixin):
     
     
-    def __init__(self,model_name: str, model_key: str):
+    def __init__(self, model_name: str, model_key: str,
+                 token_budget: int = HtmlSkeleton.DEFAULT_TOKEN_BUDGET):
         """初始化Agent"""
         # 确保API密钥已设置
         os.environ['DEEPSEEK_API_KEY'] = model_key
         
+        # 提示词中的 HTML 精简为结构骨架
+        self.skeleton = HtmlSkeleton(token_budget=token_budget)
+        
         # 创建Agent实例
         self.agent = Agent(
             model_name,
@@ -95,6 +101,7 @@ class XPathGeneratorChapterAgent:
     def _build_prompt(self, html: str) -> str:
         """构建分析提示词"""
         # 简化提示，避免过长内容
+        skeleton = self.skeleton.reduce(html)
         return f"""
 ## 章节列表分析任务
 请仔细分析以下HTML结构，生成章节列表的XPath提取规则。
@@ -118,11 +125,12 @@ class XPathGeneratorChapterAgent:
    - 判断是否需要分页处理
 
 ## HTML内容
+{HtmlSkeleton.PROMPT_NOTE}
 HTML内容开始:
-{html}
+{skeleton}
 HTML内容结束
 
-[完整HTML共{len(html)}字符]
+[完整HTML共{len(html)}字符，精简后{len(skeleton)}字符]
 
 请重点分析：
 1. 章节列表的容器（通常是ul、ol、div等包含多个章节的元素）
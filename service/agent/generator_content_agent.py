@@ -3,16 +3,22 @@ import os
 from pydantic_ai import Agent
 
 from models.data_models import ContentPageConfig
+from service.agent.rule_agent_mixin import AsyncRuleAgentMixin
+from service.html_skeleton import HtmlSkeleton
 
 
-class XPathGeneratorContentAgent:
+class XPathGeneratorContentAgent(AsyncRuleAgentMixin):
     
     
-    def __init__(self, model_name: str, model_key: str):
+    def __init__(self, model_name: str, model_key: str,
+                 token_budget: int = HtmlSkeleton.DEFAULT_TOKEN_BUDGET):
         """初始化Agent"""
         # 确保API密钥已设置
         os.environ['DEEPSEEK_API_KEY'] = model_key
         
+        # 提示词中的 HTML 精简为结构骨架
+        self.skeleton = HtmlSkeleton(token_budget=token_budget)
+        
         # 创建Agent实例
         self.agent = Agent(
             model_name,
@@ -63,11 +69,13 @@ class XPathGeneratorContentAgent:
     def _build_prompt(self, html: str) -> str:
         """构建分析提示词"""
         # 简化提示，避免过长内容
+        skeleton = self.skeleton.reduce(html)
         return f"""
 请分析以下HTML代码结构，生成小说内容的XPath选择器：
+{HtmlSkeleton.PROMPT_NOTE}
 
 HTML内容开始:
-{html}
+{skeleton}
 HTML内容结束
 
 请重点分析：
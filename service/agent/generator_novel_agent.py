@@ -3,16 +3,22 @@ import os
 from pydantic_ai import Agent
 
 from models.data_models import NovelInfoConfig
+from service.agent.rule_agent_mixin import AsyncRuleAgentMixin
+from service.html_skeleton import HtmlSkeleton
 
 
-class XPathGeneratorNovelAgent:
+class XPathGeneratorNovelAgent(AsyncRuleAgentMixin):
     
     
-    def __init__(self,model_name: str, model_key: str):
+    def __init__(self, model_name: str, model_key: str,
+                 token_budget: int = HtmlSkeleton.DEFAULT_TOKEN_BUDGET):
         """初始化Agent"""
         # 确保API密钥已设置
         os.environ['DEEPSEEK_API_KEY'] = model_key
         
+        # 提示词中的 HTML 精简为结构骨架
+        self.skeleton = HtmlSkeleton(token_budget=token_budget)
+        
         # 创建Agent实例
         self.agent = Agent(
             model_name,
@@ -93,15 +99,16 @@ class XPathGeneratorNovelAgent:
             优化后的用户提示词 - 提供更清晰的分析指导
             """
             # 提取关键信息帮助分析
-            
+            skeleton = self.skeleton.reduce(html)
             return f"""
     ## 网页结构分析任务
     请仔细分析以下小说详情页的HTML结构，为每个字段生成最优的XPath提取规则。
+    {HtmlSkeleton.PROMPT_NOTE}
     下面是html内容
-        {html}
+        {skeleton}
         上面是html内容
     ## HTML内容概览
-    - 总长度: {len(html)} 字符
+    - 总长度: {len(html)} 字符（精简后 {len(skeleton)} 字符）
     
     - 检测到可能包含小说信息的区域
 
@@ -0,0 +1,19 @@
+# service/agent/rule_agent_mixin.py
+
+
+class AsyncRuleAgentMixin:
+    """
+    XPath 生成 Agent 的公共异步接口
+    使用方需提供 self.agent（pydantic_ai.Agent）与 self._build_prompt(html)
+    """
+
+    async def generate_rules_async(self, html: str) -> str:
+        """
+        generate_rules 的异步版本，可与其他 Agent 并发调用
+
+        Returns:
+            str: 生成的XPath配置（JSON）
+        """
+        prompt = self._build_prompt(html)
+        result = await self.agent.run(prompt)
+        return result.output.model_dump_json(indent=4)
@@ -0,0 +1,137 @@
+# agents/rule_orchestrator.py
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+from models.data_models import ChapterListConfig, ContentPageConfig, NovelInfoConfig, XPathTemplate
+from service.agent.generator_chapter_agent import XPathGeneratorChapterAgent
+from service.agent.generator_content_agent import XPathGeneratorContentAgent
+from service.agent.generator_novel_agent import XPathGeneratorNovelAgent
+from service.html_skeleton import HtmlSkeleton
+from service.rule_cache import RuleCache
+from service.rule_inducer import RuleInducer
+from service.telemetry import get_logger
+
+logger = get_logger("rules")
+
+
+class XPathRuleOrchestrator:
+    """
+    规则生成编排器
+    - 小说信息、章节目录、正文三个 Agent 并发调用，总耗时约等于最慢的一次 LLM 往返
+    - 每次调用有独立超时，超时或出错按 retries 重试（间隔逐次加长）
+    - 记录每个 Agent 每次尝试的耗时，结果合并为完整的 XPathTemplate
+    - 传入 rule_cache 时先按页面结构指纹查缓存，命中且样例页校验通过就不调用 LLM；新生成的规则写回缓存
+    - 传入 inducer 时先在本地推断目录与正文规则，置信度不低于 min_confidence 的部分不再调用对应 Agent
+    """
+    DEFAULT_TIMEOUT = 90
+    DEFAULT_RETRIES = 2
+    RETRY_DELAY = 2.0
+    DEFAULT_MIN_CONFIDENCE = 0.8
+
+    def __init__(self, model_name: str, model_key: str,
+                 timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 token_budget: int = HtmlSkeleton.DEFAULT_TOKEN_BUDGET,
+                 rule_cache: Optional[RuleCache] = None,
+                 inducer: Optional[RuleInducer] = None,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.novel_agent = XPathGeneratorNovelAgent(model_name, model_key, token_budget=token_budget)
+        self.chapter_agent = XPathGeneratorChapterAgent(model_name, model_key, token_budget=token_budget)
+        self.content_agent = XPathGeneratorContentAgent(model_name, model_key, token_budget=token_budget)
+        # name -> 最终成功那次调用的耗时（秒）
+        self.timings: Dict[str, float] = {}
+        self.rule_cache = rule_cache
+        self.cache_hit = False
+        self.inducer = inducer
+        self.min_confidence = min_confidence
+        # 本地推断被采用的部分 -> 置信度
+        self.induced: Dict[str, float] = {}
+
+    async def _run_agent(self, name: str, agent, html: str) -> str:
+        """调用单个 Agent，带超时与重试，返回其 JSON 结果"""
+        last_error: Optional[BaseException] = None
+        for attempt in range(1, self.retries + 2):
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(agent.generate_rules_async(html), self.timeout)
+            except asyncio.TimeoutError as e:
+                last_error = e
+                logger.warning("[RuleGen] %s 第 %d 次调用超时（%ss）", name, attempt, self.timeout)
+            except Exception as e:
+                last_error = e
+                logger.warning("[RuleGen] %s 第 %d 次调用失败（%.1fs）: %s", name, attempt, time.perf_counter() - start, e)
+            else:
+                elapsed = time.perf_counter() - start
+                self.timings[name] = elapsed
+                logger.info("[RuleGen] %s 完成，用时 %.1fs（第 %d 次）", name, elapsed, attempt)
+                return result
+            if attempt <= self.retries:
+                await asyncio.sleep(self.RETRY_DELAY * attempt)
+        raise RuntimeError(f"{name} 规则生成失败（已尝试 {self.retries + 1} 次）: {last_error}")
+
+    async def generate(self, template: XPathTemplate, chapter_html: str, content_html: str,
+                       novel_html: Optional[str] = None) -> XPathTemplate:
+        """
+        生成三部分规则（缓存 → 本地推断 → 并发调用 Agent），合并到 template（站点信息与过滤规则沿用 template）
+
+        Args:
+            template: 基础配置模板
+            chapter_html: 目录页（已清理的 body）
+            content_html: 正文页（已清理的 body）
+            novel_html: 小说详情页，不传时使用目录页（多数站点两者是同一页）
+        """
+        self.timings = {}
+        self.cache_hit = False
+        self.induced = {}
+        if self.rule_cache is not None:
+            cached = self.rule_cache.lookup(chapter_html, content_html, novel_html)
+            if cached is not None:
+                self.cache_hit = True
+                return self._merge(template, cached)
+
+        rules: Dict[str, dict] = {}
+        if self.inducer is not None:
+            for name, induce, html in (("chapters", self.inducer.induce_chapters, chapter_html),
+                                       ("content", self.inducer.induce_content, content_html)):
+                induced, confidence = induce(html)
+                if induced is not None and confidence >= self.min_confidence:
+                    rules[name] = induced
+                    self.induced[name] = confidence
+                    logger.info("[RuleGen] %s 使用本地推断规则（置信度 %.2f）", name, confidence)
+                else:
+                    logger.info("[RuleGen] %s 本地推断置信度 %.2f，交给 Agent", name, confidence)
+
+        pending = [
+            (name, agent, html) for name, agent, html in (
+                ("novel", self.novel_agent, novel_html or chapter_html),
+                ("chapters", self.chapter_agent, chapter_html),
+                ("content", self.content_agent, content_html),
+            ) if name not in rules
+        ]
+        start = time.perf_counter()
+        outputs = await asyncio.gather(*(self._run_agent(*job) for job in pending))
+        logger.info("[RuleGen] %d 个 Agent 并发完成，总用时 %.1fs（串行约需 %.1fs）",
+                    len(pending), time.perf_counter() - start, sum(self.timings.values()))
+        for (name, _, _), output in zip(pending, outputs):
+            rules[name] = json.loads(output)
+
+        if self.rule_cache is not None:
+            self.rule_cache.store(template.site.base_url or template.site.name, rules,
+                                  chapter_html, content_html, novel_html)
+        return self._merge(template, rules)
+
+    @staticmethod
+    def _merge(template: XPathTemplate, rules: Dict[str, dict]) -> XPathTemplate:
+        return template.model_copy(update={
+            "novel": NovelInfoConfig.model_validate(rules["novel"]),
+            "chapters": ChapterListConfig.model_validate(rules["chapters"]),
+            "content": ContentPageConfig.model_validate(rules["content"]),
+        })
+
+    def generate_sync(self, template: XPathTemplate, chapter_html: str, content_html: str,
+                      novel_html: Optional[str] = None) -> XPathTemplate:
+        """同步入口（脚本中使用）"""
+        return asyncio.run(self.generate(template, chapter_html, content_html, novel_html))
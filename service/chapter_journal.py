@@ -0,0 +1,99 @@
+# service/chapter_journal.py
+import asyncio
+import json
+import os
+from typing import Dict, Optional
+
+from service.telemetry import get_logger
+
+logger = get_logger("journal")
+
+
+class ChapterJournal:
+    """
+    章节下载日志（每本书一个 JSON Lines 文件）
+    - 每章下载完成后立即追加一行并 fsync，崩溃或中断最多丢失正在写的那一行
+    - 重新运行时读取日志，已完成的章节直接跳过，只重试失败或缺失的章节
+    - 内存中只保存 url -> 文件偏移 的索引，正文按需从磁盘读取
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    def load(self) -> int:
+        """
+        扫描日志建立索引，截掉崩溃时写了一半的末行
+
+        Returns:
+            int: 已完成章节数
+        """
+        self._offsets = {}
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return 0
+
+        good_end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._offsets[record["url"]] = offset
+                good_end = f.tell()
+
+        if good_end < os.path.getsize(self.path):
+            logger.warning("[Journal] 日志末尾不完整，已截断: %s", self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+        return len(self._offsets)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    async def get(self, url: str) -> Optional[Dict]:
+        """读取某章的日志记录 {"url", "title", "content"}，不存在返回 None；读盘在工作线程中进行"""
+        offset = self._offsets.get(url)
+        if offset is None:
+            return None
+        return await asyncio.to_thread(self._read, offset)
+
+    def _read(self, offset: int) -> Dict:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    async def record(self, url: str, data: Dict):
+        """追加一条已完成章节记录，写入后立即落盘"""
+        if not self._loaded:
+            self.load()
+        line = json.dumps(
+            {"url": url, "title": data.get("title", ""), "content": data.get("content", "")},
+            ensure_ascii=False,
+        ).encode("utf-8") + b"\n"
+        async with self._lock:
+            offset = await asyncio.to_thread(self._append, line)
+            self._offsets[url] = offset
+
+    def _append(self, line: bytes) -> int:
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        return offset
@@ -0,0 +1,100 @@
+# service/chapter_manifest.py
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from service.telemetry import get_logger
+
+logger = get_logger("manifest")
+
+
+class ChapterManifest:
+    """
+    章节清单（每本书一个 JSON 文件）
+    - 按目录顺序记录每章的 url、标题与正文哈希，下载失败的章节哈希为 None
+    - 更新连载时只需抓目录页，与清单比对即可得到新增章节和需要重新抓取的章节
+    - 写入使用临时文件 + rename，中断不会留下半截清单
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chapters: List[Dict] = []
+        self._index: Dict[str, Dict] = {}
+
+    @staticmethod
+    def content_hash(content: Optional[str]) -> Optional[str]:
+        if not content:
+            return None
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> int:
+        """
+        读取清单，不存在或已损坏时视为空清单
+
+        Returns:
+            int: 清单中的章节数
+        """
+        self.chapters = []
+        if self.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.chapters = json.load(f).get("chapters", [])
+            except (OSError, ValueError) as e:
+                logger.warning("[Manifest] 清单读取失败，按空清单处理 %s: %s", self.path, e)
+        self._index = {ch["url"]: ch for ch in self.chapters}
+        return len(self.chapters)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self._index.get(url)
+
+    def urls(self) -> List[str]:
+        return [ch["url"] for ch in self.chapters]
+
+    def diff(self, chapters: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        与最新目录比对
+
+        Returns:
+            (new, stale): 清单中没有的章节；标题变化或上次下载失败、需要重新抓取的章节
+        """
+        new, stale = [], []
+        for chap in chapters:
+            entry = self._index.get(chap["url"])
+            if entry is None:
+                new.append(chap)
+            elif entry.get("hash") is None or entry.get("title") != chap["title"]:
+                stale.append(chap)
+        return new, stale
+
+    def is_prefix_of(self, chapters: List[Dict]) -> bool:
+        """清单是否为新目录的前缀（新增章节全部在末尾，可直接追加）"""
+        urls = self.urls()
+        return [ch["url"] for ch in chapters[:len(urls)]] == urls
+
+    def save(self, chapters: List[Dict], hashes: Dict[str, Optional[str]]):
+        """按目录顺序写入清单，hashes 为 url -> 正文哈希"""
+        self.chapters = [
+            {"url": ch["url"], "title": ch["title"], "hash": hashes.get(ch["url"])}
+            for ch in chapters
+        ]
+        self._index = {ch["url"]: ch for ch in self.chapters}
+
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        data = {"updated_at": time.time(), "chapters": self.chapters}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
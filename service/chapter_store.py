@@ -0,0 +1,369 @@
+# service/chapter_store.py
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from typing import Dict, Iterator, Optional, Tuple
+
+from service.telemetry import Metrics
+
+try:
+    import zstandard  # 可选依赖，未安装时使用 zlib
+except ImportError:
+    zstandard = None
+
+
+def _zlib_compress(data: bytes, level: int) -> bytes:
+    return zlib.compress(data, level)
+
+
+def _zstd_compress(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+_COMPRESSORS = {"zlib": _zlib_compress, "zstd": _zstd_compress}
+_DECOMPRESSORS = {"zlib": zlib.decompress, "zstd": _zstd_decompress}
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    idx   INTEGER PRIMARY KEY,   -- 章节序号（从 0 开始），即 rowid，按序号直接定位
+    title TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    size  INTEGER NOT NULL,      -- 解压后的字节数
+    body  BLOB NOT NULL
+);
+"""
+
+
+class ChapterStore:
+    """
+    单文件章节库（SQLite，每本书一个 .db）
+    - 每章一行，正文按章独立压缩（默认 zstd，未安装 zstandard 时 zlib），章节序号即主键，
+      读取任意一章只需一次主键查找与一次解压，不必扫描整本书
+    - 写入接口与 StreamingNovelWriter 一致（open / write / close），download_novel 可直接替换输出后端；
+      同一序号再次写入会覆盖原行，重新下载只改动变化的章节
+    - 异步接口（open / write / close / *_async）的压缩、SQL 与提交都在本库专用的单线程执行器中完成，
+      不阻塞事件循环，且同一连接始终只被一个线程按提交顺序使用；同步接口供工作线程中的导出等场景使用
+    - export_txt / export_epub 逐章读取、逐章写出，内存占用与书的长度无关
+    """
+    DEFAULT_COMMIT_INTERVAL = 50
+    DEFAULT_LEVEL = {"zlib": 6, "zstd": 9}
+    EXPORT_BATCH = 64
+
+    def __init__(self, path: str, codec: Optional[str] = None, level: Optional[int] = None,
+                 commit_interval: int = DEFAULT_COMMIT_INTERVAL, metrics: Optional[Metrics] = None):
+        codec = codec or DEFAULT_CODEC
+        if codec not in _COMPRESSORS:
+            raise ValueError(f"不支持的压缩算法: {codec}（可选 {', '.join(_COMPRESSORS)}）")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("未安装 zstandard，无法使用 zstd 压缩")
+        self.path = path
+        self.codec = codec
+        self.level = self.DEFAULT_LEVEL[codec] if level is None else level
+        self.commit_interval = max(1, commit_interval)
+        self.metrics = metrics or Metrics.get_instance()
+        self.written = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._base = 0
+        self._since_commit = 0
+
+    # ---------- 连接 ----------
+
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            # 异步接口在执行器线程中使用连接，需允许跨线程（同一时间只有一个调用方）
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def commit(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._since_commit = 0
+
+    async def _run(self, func, *args):
+        """在本库的单线程执行器中执行 func(*args)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chapter-store")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # ---------- 写入 ----------
+
+    def put(self, idx: int, text: str, title: Optional[str] = None):
+        """写入（或覆盖）第 idx 章，text 为最终输出的章节文本；title 缺省时取文本第一行非空内容"""
+        if title is None:
+            title = next((line.strip() for line in text.splitlines() if line.strip()), "")
+        start = time.perf_counter()
+        raw = text.encode("utf-8")
+        body = _COMPRESSORS[self.codec](raw, self.level)
+        self.connect().execute(
+            "INSERT OR REPLACE INTO chapters (idx, title, codec, size, body) VALUES (?, ?, ?, ?, ?)",
+            (idx, title, self.codec, len(raw), body),
+        )
+        self.metrics.observe("write_seconds", time.perf_counter() - start)
+        self._since_commit += 1
+
+    def truncate(self, count: int):
+        """删除序号 >= count 的章节（目录变短后重建时使用）"""
+        self.connect().execute("DELETE FROM chapters WHERE idx >= ?", (count,))
+
+    def set_meta(self, **values):
+        self.connect().executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, "" if v is None else str(v)) for k, v in values.items()],
+        )
+
+    def meta(self) -> Dict[str, str]:
+        return dict(self.connect().execute("SELECT key, value FROM meta"))
+
+    async def put_async(self, idx: int, text: str, title: Optional[str] = None):
+        await self._run(self.put, idx, text, title)
+
+    async def truncate_async(self, count: int):
+        await self._run(self.truncate, count)
+
+    async def set_meta_async(self, **values):
+        await self._run(lambda: self.set_meta(**values))
+
+    def _prepare(self, header: Optional[str], append: bool):
+        if "uuid" not in self.meta():
+            self.set_meta(uuid=f"urn:uuid:{uuid.uuid4()}")
+        if header is not None:
+            self.set_meta(header=header)
+        self._base = len(self) if append else 0
+
+    async def open(self, header: Optional[str] = None, append: bool = False):
+        """
+        准备写入：header 记入元信息（导出 TXT 时作为文件头）
+        append=True 时 write(i) 写到已有章节之后（第 len(self) + i 章），与 TXT 追加写的语义一致
+        """
+        await self._run(self._prepare, header, append)
+
+    async def write(self, idx: int, text: str):
+        """提交第 idx 章的文本"""
+        await self.put_async(self._base + idx, text)
+        self.written += 1
+        if self._since_commit >= self.commit_interval:
+            await self._commit_async()
+
+    async def _commit_async(self):
+        start = time.perf_counter()
+        await self._run(self.commit)
+        self.metrics.observe("fsync_seconds", time.perf_counter() - start)
+
+    def _close_conn(self):
+        self.commit()
+        self._conn.close()
+        self._conn = None
+
+    async def close(self):
+        if self._conn is not None:
+            start = time.perf_counter()
+            await self._run(self._close_conn)
+            self.metrics.observe("fsync_seconds", time.perf_counter() - start)
+        self._shutdown_executor()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # 只读或导出等同步场景（如在工作线程中）使用 with ChapterStore(path) as store
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._conn is not None:
+            self._close_conn()
+        self._shutdown_executor()
+
+    # ---------- 读取 ----------
+
+    def __len__(self) -> int:
+        row = self.connect().execute("SELECT MAX(idx) FROM chapters").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    @staticmethod
+    def _decode(codec: str, body: bytes) -> str:
+        return _DECOMPRESSORS[codec](body).decode("utf-8")
+
+    def get(self, idx: int) -> Optional[Dict]:
+        """读取第 idx 章 {"idx", "title", "text"}，不存在返回 None"""
+        row = self.connect().execute(
+            "SELECT title, codec, body FROM chapters WHERE idx = ?", (idx,)
+        ).fetchone()
+        if row is None:
+            return None
+        title, codec, body = row
+        return {"idx": idx, "title": title, "text": self._decode(codec, body)}
+
+    def titles(self) -> Iterator[Tuple[int, str]]:
+        """按顺序产出 (序号, 标题)，不读取正文"""
+        yield from self.connect().execute("SELECT idx, title FROM chapters ORDER BY idx")
+
+    def iter_chapters(self, start: int = 0) -> Iterator[Dict]:
+        """从第 start 章起按顺序逐章产出，按主键分批查询，每批只解压少量章节"""
+        conn = self.connect()
+        while True:
+            rows = conn.execute(
+                "SELECT idx, title, codec, body FROM chapters WHERE idx >= ? ORDER BY idx LIMIT ?",
+                (start, self.EXPORT_BATCH),
+            ).fetchall()
+            if not rows:
+                return
+            for idx, title, codec, body in rows:
+                yield {"idx": idx, "title": title, "text": self._decode(codec, body)}
+            start = rows[-1][0] + 1
+
+    def stats(self) -> Dict:
+        """章节数、正文原始大小与压缩后大小"""
+        count, raw, packed = self.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM chapters"
+        ).fetchone()
+        return {
+            "chapters": count,
+            "raw_bytes": raw,
+            "stored_bytes": packed,
+            "ratio": round(packed / raw, 4) if raw else 0.0,
+        }
+
+    # ---------- 导出 ----------
+
+    def export_txt(self, path: str) -> str:
+        """导出为 TXT（与 txt 输出后端的内容一致），逐章写出"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.meta().get("header", ""))
+            for chapter in self.iter_chapters():
+                f.write(chapter["text"])
+        os.replace(tmp_path, path)
+        return path
+
+    def export_epub(self, path: str, title: Optional[str] = None, author: Optional[str] = None,
+                    language: str = "zh") -> str:
+        """
+        导出为 EPUB 3（每章一个 XHTML，附 nav 目录与 toc.ncx）
+        正文逐章压缩写入 zip，目录只用到标题，不需要把整本书读进内存
+        """
+        meta = self.meta()
+        title = title or meta.get("title") or os.path.splitext(os.path.basename(self.path))[0]
+        author = author if author is not None else meta.get("author", "")
+        book_id = meta.get("uuid") or f"urn:uuid:{uuid.uuid4()}"
+
+        tmp_path = f"{path}.tmp"
+        entries = []
+        with zipfile.ZipFile(tmp_path, "w") as zf:
+            # mimetype 必须是第一个条目且不压缩
+            zf.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            zf.writestr("META-INF/container.xml", _CONTAINER_XML, compress_type=zipfile.ZIP_DEFLATED)
+            for chapter in self.iter_chapters():
+                name = f"chapter_{chapter['idx']:05d}.xhtml"
+                entries.append((name, chapter["title"]))
+                zf.writestr(f"OEBPS/{name}", _chapter_xhtml(chapter["title"], chapter["text"], language),
+                            compress_type=zipfile.ZIP_DEFLATED)
+            zf.writestr("OEBPS/nav.xhtml", _nav_xhtml(title, entries, language), compress_type=zipfile.ZIP_DEFLATED)
+            zf.writestr("OEBPS/toc.ncx", _toc_ncx(book_id, title, entries), compress_type=zipfile.ZIP_DEFLATED)
+            zf.writestr("OEBPS/content.opf", _content_opf(book_id, title, author, language, entries),
+                        compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, path)
+        return path
+
+
+# ===========================================
+# EPUB 模板
+# ===========================================
+
+_CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def _chapter_xhtml(title: str, text: str, language: str) -> str:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    # 章节文本第一行是标题，正文从第二行开始
+    if lines and lines[0] == title:
+        lines = lines[1:]
+    body = "\n".join(f"<p>{escape(line)}</p>" for line in lines)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+        f'<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="{language}" lang="{language}">\n'
+        f"<head><meta charset=\"UTF-8\"/><title>{escape(title)}</title></head>\n"
+        f"<body>\n<h2>{escape(title)}</h2>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def _nav_xhtml(title: str, entries, language: str) -> str:
+    items = "\n".join(f'<li><a href="{name}">{escape(t)}</a></li>' for name, t in entries)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+        f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        f'xml:lang="{language}" lang="{language}">\n'
+        f"<head><meta charset=\"UTF-8\"/><title>{escape(title)}</title></head>\n"
+        f'<body>\n<nav epub:type="toc" id="toc"><h1>{escape(title)}</h1>\n<ol>\n{items}\n</ol></nav>\n</body>\n</html>\n'
+    )
+
+
+def _toc_ncx(book_id: str, title: str, entries) -> str:
+    points = "\n".join(
+        f'<navPoint id="nav{i}" playOrder="{i}"><navLabel><text>{escape(t)}</text></navLabel>'
+        f'<content src="{name}"/></navPoint>'
+        for i, (name, t) in enumerate(entries, 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+        f'<head><meta name="dtb:uid" content="{escape(book_id)}"/></head>\n'
+        f"<docTitle><text>{escape(title)}</text></docTitle>\n<navMap>\n{points}\n</navMap>\n</ncx>\n"
+    )
+
+
+def _content_opf(book_id: str, title: str, author: str, language: str, entries) -> str:
+    manifest = "\n".join(
+        f'<item id="c{i}" href="{name}" media-type="application/xhtml+xml"/>' for i, (name, _) in enumerate(entries)
+    )
+    spine = "\n".join(f'<itemref idref="c{i}"/>' for i in range(len(entries)))
+    modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+        f'<dc:identifier id="book-id">{escape(book_id)}</dc:identifier>\n'
+        f"<dc:title>{escape(title)}</dc:title>\n<dc:creator>{escape(author)}</dc:creator>\n"
+        f"<dc:language>{language}</dc:language>\n"
+        f'<meta property="dcterms:modified">{modified}</meta>\n</metadata>\n'
+        '<manifest>\n<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+        '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>\n'
+        f"{manifest}\n</manifest>\n"
+        f'<spine toc="ncx">\n{spine}\n</spine>\n</package>\n'
+    )
@@ -0,0 +1,166 @@
+# service/circuit_breaker.py
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from service.telemetry import Metrics, get_logger
+
+logger = get_logger("circuit")
+
+
+class HostCircuit:
+    """
+    单个 host 的熔断状态
+    - closed：正常放行，连续 failure_threshold 次主机级故障（超时、连接失败、5xx）后熔断
+    - open：cooldown 秒内所有请求直接拒绝，不再占用重试次数与并发名额
+    - half_open：冷却结束后只放行一个探测请求；成功则恢复 closed，失败则重新熔断且冷却时间翻倍
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int = 5, cooldown: float = 30.0,
+                 max_cooldown: float = 300.0, metrics: Optional[Metrics] = None):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.metrics = metrics or Metrics.get_instance()
+
+        self._state = self.CLOSED
+        self.failures = 0                 # 连续故障次数
+        self.cooldown = cooldown          # 当前冷却时长，探测失败时翻倍
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() >= self.opened_until:
+            return self.HALF_OPEN
+        return self._state
+
+    def retry_in(self) -> float:
+        """距离下一次允许探测还有多少秒，非 open 状态为 0"""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def allow(self) -> bool:
+        """是否放行一次请求；half_open 时只有第一个调用方拿到探测机会"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self.probe_in_flight:
+            self._transition(self.HALF_OPEN)
+            self.probe_in_flight = True
+            self.stats["probes"] += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record(self, healthy: Optional[bool]):
+        """
+        记录一次请求结果
+
+        Args:
+            healthy: True 主机有正常响应（含 404 等客户端错误）；False 主机级故障；
+                     None 无法判断（被取消、429 限流等），只归还探测机会
+        """
+        if healthy is None:
+            self.probe_in_flight = False
+        elif healthy:
+            self._on_success()
+        else:
+            self._on_failure()
+
+    def _on_success(self):
+        self.failures = 0
+        self.probe_in_flight = False
+        if self._state != self.CLOSED:
+            logger.info("🟢 %s 已恢复，熔断关闭", self.host)
+            self.cooldown = self.base_cooldown
+            self._transition(self.CLOSED)
+
+    def _on_failure(self):
+        self.failures += 1
+        if self._state == self.HALF_OPEN:
+            # 探测失败，冷却时间指数增长
+            self.probe_in_flight = False
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._open()
+        elif self._state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.opened_until = time.monotonic() + self.cooldown
+        self.stats["opened"] += 1
+        logger.warning("🔴 %s 连续 %d 次故障，熔断 %.1fs", self.host, self.failures, self.cooldown)
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        if self._state != state:
+            self._state = state
+            self.metrics.inc("circuit_transitions_total", host=self.host, state=state)
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "cooldown": self.cooldown,
+            "retry_in": round(self.retry_in(), 2),
+            **self.stats,
+        }
+
+
+class CircuitBreaker:
+    """
+    按域名分配 HostCircuit 的进程级熔断器
+    - RequestManager 每次发请求前调用 allow(url)，熔断期间直接失败，不等超时
+    - 调度器可通过 state(host) / retry_in(host) 查看站点状态，把名额让给其他站点
+    """
+
+    _instance: Optional["CircuitBreaker"] = None
+
+    def __init__(self, **host_kwargs):
+        self.host_kwargs = host_kwargs
+        self._hosts: Dict[str, HostCircuit] = {}
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "CircuitBreaker":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def get(self, host: str) -> HostCircuit:
+        host = host.lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostCircuit(host, **self.host_kwargs)
+        return self._hosts[host]
+
+    def allow(self, url: str) -> bool:
+        return self.get(self.host_of(url)).allow()
+
+    def record(self, url: str, healthy: Optional[bool]):
+        self.get(self.host_of(url)).record(healthy)
+
+    def state(self, host: str) -> str:
+        circuit = self._hosts.get(host.lower())
+        return circuit.state if circuit else HostCircuit.CLOSED
+
+    def retry_in(self, host: str) -> float:
+        circuit = self._hosts.get(host.lower())
+        return circuit.retry_in() if circuit else 0.0
+
+    def is_available(self, host: str) -> bool:
+        """closed 或冷却已结束（可以探测）时为 True"""
+        return self.state(host) != HostCircuit.OPEN
+
+    def get_states(self) -> Dict[str, Dict]:
+        """各域名当前的熔断状态与统计"""
+        return {host: circuit.snapshot() for host, circuit in self._hosts.items()}
@@ -1,30 +1,69 @@
 # service/config_service.py
 import os
 import json
+import time
 from urllib.parse import urlparse
-from typing import Dict, Any
+from typing import Dict, Any, Optional, List
+
+import yaml
+from pydantic import ValidationError
+
+from models.data_models import XPathTemplate, SiteConfig
+from service.telemetry import get_logger
+
+logger = get_logger("config")
+
+CONFIG_EXTENSIONS = (".json", ".yaml", ".yml")
+
+
+def read_config_file(config_path: str) -> Dict[str, Any]:
+    """读取单个配置文件（.json / .yaml / .yml），返回原始字典"""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            if config_path.lower().endswith(".json"):
+                config = json.load(f)
+            else:
+                config = yaml.safe_load(f)
+    except (json.JSONDecodeError, yaml.YAMLError) as e:
+        raise ValueError(f"配置文件格式错误 (解析失败): {config_path}\n{e}")
+    except Exception as e:
+        raise ValueError(f"配置文件加载失败: {config_path}\n{e}")
+
+    if not isinstance(config, dict):
+        raise ValueError(f"配置文件内容不是对象: {config_path}")
+    return normalize_config(config)
+
+
+def normalize_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    统一配置结构：YAML 配置把站点字段（name、base_url 等）平铺在顶层，
+    这里收拢到 site 节点下，与 XPathTemplate 的结构保持一致
+    """
+    if "site" in config:
+        return config
+    site_fields = set(SiteConfig.model_fields)
+    normalized = {k: v for k, v in config.items() if k not in site_fields}
+    normalized["site"] = {k: v for k, v in config.items() if k in site_fields}
+    return normalized
 
-from models.data_models import XPathTemplate
 
 class ConfigService:
     def __init__(self, config_dir="./config"):
         self.config_dir = config_dir
 
     def get_config_path(self, url: str) -> str:
-        """根据 URL 获取配置文件路径（仅支持 .json）"""
+        """根据 URL 获取配置文件路径（.json 优先，其次 .yaml / .yml）"""
         domain = urlparse(url).netloc
-        
-        # 只检查 .json 扩展名
-        ext = ".json"
-        print(f"尝试加载配置文件: {self.config_dir}/{domain}{ext}")
-        candidate = os.path.join(self.config_dir, f"{domain}{ext}")
-        
-        if os.path.exists(candidate):
-            return candidate
+
+        for ext in CONFIG_EXTENSIONS:
+            candidate = os.path.join(self.config_dir, f"{domain}{ext}")
+            if os.path.exists(candidate):
+                logger.debug("[ConfigService] 尝试加载配置文件: %s", candidate)
+                return candidate
 
         # ⚠️ 确保默认配置也是 .json
         default_path = os.path.join(self.config_dir, "default.json")
-        print(f"[⚠] 未找到 {domain} 的配置，使用默认配置 {default_path}")
+        logger.warning("[ConfigService] 未找到 %s 的配置，使用默认配置 %s", domain, default_path)
         return default_path
 
     def extract_domain_from_url(self, url: str) -> str:
@@ -35,30 +74,14 @@ class ConfigService:
         return parsed.hostname
 
     def load_config(self, url: str) -> Dict[str, Any]:
-        """加载配置（仅使用 JSON 格式）"""
+        """直接从磁盘加载配置（JSON / YAML），运行期查询请使用 ConfigRegistry"""
         config_path = self.get_config_path(url)
-        
+
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"配置文件不存在: {config_path}")
 
-        # 检查是否是 .json 文件，防止意外加载其他格式
-        if not config_path.lower().endswith('.json'):
-             raise ValueError(f"只支持 JSON 配置文件，但尝试加载了: {config_path}")
-
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                # 仅使用内置的 json 库加载
-                config = json.load(f)
-                    
-        except json.JSONDecodeError as e:
-            # JSON 解析错误
-            raise ValueError(f"配置文件格式错误 (JSON 解析失败): {config_path}\n{e}")
-        except Exception as e:
-            # 其他文件读取错误
-            raise ValueError(f"配置文件加载失败: {config_path}\n{e}")
+        return read_config_file(config_path)
 
-        return config
-    
     # --- JSON 保存函数 ---
     def save_config_to_json(self, config_object: XPathTemplate, config_dir: str = "./config"):
         """将最终的 Pydantic XPathTemplate 对象保存为结构化的 JSON 文件。"""
@@ -82,6 +105,156 @@ class ConfigService:
             with open(new_config_path, 'w', encoding='utf-8') as f:
                 # 使用 ensure_ascii=False 确保中文不被转义
                 f.write(final_json_string)
-            print(f"\n🎉 配置已成功保存到文件: {os.path.abspath(new_config_path)}")
+            logger.info("[ConfigService] 配置已成功保存到文件: %s", os.path.abspath(new_config_path))
         except Exception as e:
-            print(f"\n❌ 保存配置文件失败: {e}")
\ No newline at end of file
+            logger.error("[ConfigService] 保存配置文件失败: %s", e)
+
+
+class ConfigRegistry:
+    """
+    站点配置注册表（进程内常驻）
+    - 一次性加载配置目录下所有 .json / .yaml / .yml，校验为 XPathTemplate
+    - 按域名建立索引：文件名域名、site.base_url 的域名、去掉 www 的主域名以及 site.aliases
+    - 查询为字典查找；子域名（如 m.xxx.com）逐级向上回退到已登记的域名
+    - 热加载：每隔 check_interval 秒检查一次目录，只重新加载 mtime 变化的文件
+    """
+    DEFAULT_CHECK_INTERVAL = 5.0
+
+    _instance: Optional["ConfigRegistry"] = None
+
+    def __init__(self, config_dir: str = "./config", check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.config_dir = config_dir
+        self.check_interval = check_interval
+
+        # path -> {"mtime", "template", "config", "domains"}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        # domain -> path
+        self._domains: Dict[str, str] = {}
+        self._last_check = 0.0
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "ConfigRegistry":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    # ---------- 加载 ----------
+
+    def reload(self, force: bool = False) -> List[str]:
+        """
+        扫描配置目录，只加载新增或 mtime 变化的文件，移除已删除文件的索引
+
+        Returns:
+            List[str]: 本次重新加载的文件路径
+        """
+        self._last_check = time.monotonic()
+        try:
+            names = os.listdir(self.config_dir)
+        except OSError as e:
+            logger.error("[ConfigRegistry] 无法读取配置目录 %s: %s", self.config_dir, e)
+            return []
+
+        seen = set()
+        reloaded = []
+        for name in names:
+            if not name.lower().endswith(CONFIG_EXTENSIONS):
+                continue
+            path = os.path.join(self.config_dir, name)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            seen.add(path)
+            entry = self._files.get(path)
+            if not force and entry and entry["mtime"] == mtime:
+                continue
+            self._load_file(path, mtime)
+            reloaded.append(path)
+
+        for path in list(self._files):
+            if path not in seen:
+                self._unload_file(path)
+        return reloaded
+
+    def _load_file(self, path: str, mtime: float):
+        self._unload_file(path)
+        try:
+            config = read_config_file(path)
+            template = XPathTemplate.model_validate(config)
+        except (ValueError, ValidationError) as e:
+            # 记录 mtime，文件未修改前不再重复尝试
+            logger.warning("[ConfigRegistry] 跳过无效配置 %s: %s", path, e)
+            self._files[path] = {"mtime": mtime, "template": None, "config": None, "domains": []}
+            return
+
+        file_domain = os.path.splitext(os.path.basename(path))[0]
+        domains = self._domains_for(file_domain, template)
+        self._files[path] = {
+            "mtime": mtime,
+            "template": template,
+            "config": template.model_dump(),
+            "domains": domains,
+        }
+        for domain in domains:
+            other = self._domains.get(domain)
+            if other and other != path:
+                logger.warning("[ConfigRegistry] 域名 %s 同时出现在 %s 与 %s，使用后者", domain, other, path)
+            self._domains[domain] = path
+
+    def _unload_file(self, path: str):
+        entry = self._files.pop(path, None)
+        if not entry:
+            return
+        for domain in entry["domains"]:
+            if self._domains.get(domain) == path:
+                del self._domains[domain]
+
+    @staticmethod
+    def _domains_for(file_domain: str, template: XPathTemplate) -> List[str]:
+        candidates = [file_domain, urlparse(template.site.base_url).hostname or ""]
+        for alias in template.site.aliases:
+            candidates.append(urlparse(alias).hostname if "//" in alias else alias)
+
+        domains = []
+        for domain in candidates:
+            domain = (domain or "").strip().lower()
+            if not domain or "." not in domain:
+                continue
+            for item in (domain, domain[4:] if domain.startswith("www.") else None):
+                if item and item not in domains:
+                    domains.append(item)
+        return domains
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.reload()
+
+    # ---------- 查询 ----------
+
+    def _lookup(self, url_or_domain: str) -> Optional[Dict[str, Any]]:
+        self._maybe_reload()
+        host = urlparse(url_or_domain).hostname if "//" in url_or_domain else url_or_domain
+        host = (host or "").lower()
+
+        # 子域名逐级回退：m.www.xxx.com -> www.xxx.com -> xxx.com
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            path = self._domains.get(".".join(labels[i:]))
+            if path:
+                return self._files[path]
+        return None
+
+    def get(self, url_or_domain: str) -> Optional[XPathTemplate]:
+        """按 URL 或域名查找已校验的配置对象，找不到返回 None"""
+        entry = self._lookup(url_or_domain)
+        return entry["template"] if entry else None
+
+    def get_config(self, url_or_domain: str) -> Optional[Dict[str, Any]]:
+        """按 URL 或域名查找配置字典（XPathTemplate.model_dump 的缓存结果，调用方不应修改）"""
+        entry = self._lookup(url_or_domain)
+        return entry["config"] if entry else None
+
+    def domains(self) -> List[str]:
+        self._maybe_reload()
+        return sorted(self._domains)
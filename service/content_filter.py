@@ -0,0 +1,150 @@
+# service/content_filter.py
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from lxml import etree
+
+from service.telemetry import get_logger
+
+logger = get_logger("filter")
+
+try:
+    import ahocorasick  # pyahocorasick（requirements.txt 已列出），缺失时退化为正则
+except ImportError:
+    ahocorasick = None
+
+# 出现这些字符才按正则处理，否则视为纯文本关键字
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+class ContentFilter:
+    """
+    正文过滤引擎（每个站点编译一次）
+    - filters.regex 中的纯文本关键字放入 Aho-Corasick 自动机（依赖 pyahocorasick；未安装时退化为一条转义后的正则，结果相同但规则多时较慢）
+    - 真正的正则表达式合并为一条交替表达式，每段只扫描一次
+    - filters.remove_html 的 XPath 合并为一条联合查询，在抽取正文前一次性删除节点
+    - 命中任意规则的段落整段丢弃
+    """
+
+    def __init__(self, filters: Optional[Dict[str, Any]] = None):
+        filters = filters or {}
+        literals, patterns = self._split_rules(filters.get("regex") or [])
+
+        self.literals = literals
+        self.patterns = patterns
+        self._automaton = self._build_automaton(literals)
+        self._literal_re = None
+        if literals and self._automaton is None:
+            # 长词优先，避免短词截断匹配
+            ordered = sorted(literals, key=len, reverse=True)
+            self._literal_re = re.compile("|".join(re.escape(w) for w in ordered))
+        self._pattern_re = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+
+        self._remove_xpath = self._compile_remove(filters.get("remove_html") or [])
+        self._eval_error_logged = False
+
+    @staticmethod
+    def is_literal(rule: str) -> bool:
+        return not any(ch in _REGEX_META for ch in rule)
+
+    @classmethod
+    def _split_rules(cls, rules: Iterable[str]):
+        literals, patterns = [], []
+        for rule in rules:
+            if not rule:
+                continue
+            if cls.is_literal(rule):
+                literals.append(rule)
+                continue
+            try:
+                re.compile(rule)
+            except re.error as e:
+                logger.warning("[ContentFilter] 跳过无效正则 %r: %s", rule, e)
+                continue
+            patterns.append(rule)
+        return literals, patterns
+
+    @staticmethod
+    def _build_automaton(literals: List[str]):
+        if not literals or ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for word in literals:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        return automaton
+
+    @staticmethod
+    def _compile_remove(xpaths: List[str]) -> Optional[etree.XPath]:
+        valid = []
+        for expr in xpaths:
+            expr = (expr or "").strip()
+            if not expr:
+                continue
+            try:
+                etree.XPath(expr)
+            except etree.XPathSyntaxError:
+                logger.warning("[ContentFilter] 跳过无效的 remove_html 规则: %s", expr)
+                continue
+            valid.append(expr)
+        if not valid:
+            return None
+        return etree.XPath(" | ".join(f"({expr})" for expr in valid))
+
+    # ---------- 文本过滤 ----------
+
+    def matches(self, text: str) -> bool:
+        """段落是否命中任意过滤规则"""
+        if self._automaton is not None:
+            for _ in self._automaton.iter(text):
+                return True
+        elif self._literal_re is not None and self._literal_re.search(text):
+            return True
+        return self._pattern_re is not None and self._pattern_re.search(text) is not None
+
+    def filter_paragraphs(self, paragraphs: Iterable[str]) -> List[str]:
+        """去掉首尾空白、空段落以及命中规则的段落"""
+        result = []
+        for p in paragraphs:
+            p = p.strip()
+            if p and not self.matches(p):
+                result.append(p)
+        return result
+
+    # ---------- 节点过滤 ----------
+
+    def clean_tree(self, root) -> int:
+        """
+        删除 remove_html 命中的节点（保留节点后面的 tail 文本）
+
+        Returns:
+            int: 删除的节点数
+        """
+        if self._remove_xpath is None or root is None:
+            return 0
+        try:
+            targets = self._remove_xpath(root)
+        except etree.XPathEvalError as e:
+            # 语法正确但求值出错（如未定义的函数、命名空间前缀），每个过滤器只提示一次，本页跳过删除
+            if not self._eval_error_logged:
+                self._eval_error_logged = True
+                logger.warning("[ContentFilter] remove_html 规则求值失败，跳过节点删除: %s", e)
+            return 0
+        if not isinstance(targets, list):
+            return 0
+        removed = 0
+        for el in targets:
+            if not isinstance(el, etree._Element):
+                continue
+            parent = el.getparent()
+            if parent is None:
+                continue
+            if el.tail:
+                prev = el.getprevious()
+                if prev is not None:
+                    prev.tail = (prev.tail or "") + el.tail
+                else:
+                    parent.text = (parent.text or "") + el.tail
+            parent.remove(el)
+            removed += 1
+        return removed
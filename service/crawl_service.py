@@ -1,35 +1,58 @@
 # service/crawl_service.py
 import posixpath
-import re
 from urllib.parse import urlparse, unquote, urlunparse
 from typing import List, Dict
 import asyncio
-from lxml import html
-from lxml.etree import Comment
+from service.circuit_breaker import CircuitBreaker
 from service.fetch_utils import RequestManager
+from service.html_cleaner import HtmlCleaner
+from service.http_cache import HttpCache
+from service.rate_limiter import RateLimiter
+from service.session_manager import SessionManager
+from service.telemetry import get_logger
+
+logger = get_logger("crawl")
 
 class CrawlService:
-    def __init__(self, proxies=None, max_concurrent=5):
-        self.req_mgr = RequestManager(proxies=proxies, max_concurrent=max_concurrent)
+    def __init__(self, proxies=None, max_concurrent=5, session_manager: SessionManager = None,
+                 cache: HttpCache = None, rate_limiter: RateLimiter = None,
+                 circuit_breaker: CircuitBreaker = None):
+        # 默认使用进程级共享 session，连接在多次抓取之间保持复用
+        self.session_manager = session_manager or SessionManager.get_instance()
+        self.req_mgr = RequestManager(
+            proxies=proxies,
+            max_concurrent=max_concurrent,
+            session_manager=self.session_manager,
+            cache=cache,
+            rate_limiter=rate_limiter or RateLimiter.get_instance(),
+            circuit_breaker=circuit_breaker or CircuitBreaker.get_instance(),
+        )
 
-    async def async_fetch_multiple(self, urls: List[str], retry: int = 3) -> List[Dict]:
+    async def async_fetch_multiple(self, urls: List[str], retry: int = 3, raw: bool = False,
+                                   speculative: bool = False, use_cache: bool = True) -> List[Dict]:
         """
         异步批量获取多个 URL 页面内容（自动容错）
+        raw=True 时返回原始字节与判定好的编码，不做解码；speculative=True 表示预测的 URL，不存在属正常情况；
+        use_cache=False 时跳过磁盘缓存
         """
         try:
-            async with self.req_mgr:
-                results = await self.req_mgr.request_batch(urls, retry=retry)
-            return results
+            # 不再逐批关闭 session，连接留在池中供后续请求复用
+            return await self.req_mgr.request_batch(urls, retry=retry, raw=raw, speculative=speculative,
+                                                    use_cache=use_cache)
         except Exception as e:
-            print(f"[AsyncBatch] 批量抓取异常: {e}")
+            logger.error("[AsyncBatch] 批量抓取异常: %s", e)
             return []
 
-    async def async_fetch_single(self, url: str, retry: int = 3) -> Dict:
+    async def async_fetch_single(self, url: str, retry: int = 3, raw: bool = False,
+                                 speculative: bool = False, use_cache: bool = True) -> Dict:
         """
         异步抓取单个 URL 内容
         """
-        results = await self.async_fetch_multiple([url], retry=retry)
-        return results[0] if results else {"url": url, "html": None}
+        results = await self.async_fetch_multiple([url], retry=retry, raw=raw, speculative=speculative,
+                                                  use_cache=use_cache)
+        if results:
+            return results[0]
+        return {"url": url, "content": None, "encoding": None} if raw else {"url": url, "html": None}
 
     def resolve_url(self, base_url: str, relative: str) -> str:
         """
@@ -54,61 +77,38 @@ class CrawlService:
                 )
             return urlunparse(base_parts)
         except Exception as e:
-            print(f"[resolve_url] 解析失败: {base_url} + {relative} ({e})")
+            logger.warning("[resolve_url] 解析失败: %s + %s (%s)", base_url, relative, e)
             return relative
 
     def extract_clean_body(self, html_content: str) -> str:
         """
-        提取HTML中的body内容，并清除干扰元素
+        提取HTML中的body内容，并清除干扰元素（脚本样式、注释、页眉页脚导航等，一次遍历完成）
         """
-        if not html_content:
-            return ""
-        try:
-            parser = html.HTMLParser(recover=True, encoding="utf-8")
-            tree = html.fromstring(html_content, parser=parser)
-            body = tree.xpath("//body")
-            if not body:
-                return ""
-            body = body[0]
-        except Exception:
-            return ""
+        return HtmlCleaner(dedupe_links=False).clean_html(html_content)
+    
+    
+    def get_session_stats(self) -> Dict:
+        """连接池复用统计"""
+        return self.session_manager.get_stats()
 
-        # 清除噪音元素
-        for tag in ["script", "style", "link", "meta", "noscript","input"]:
-            for e in body.xpath(f".//{tag}"):
-                if e.getparent() is not None:
-                    e.getparent().remove(e)
-        for comment in body.xpath("//comment()"):
-            if comment.getparent() is not None:
-                comment.getparent().remove(comment)
+    def get_rate_stats(self) -> Dict:
+        """各域名当前的限速状态"""
+        return self.req_mgr.rate_limiter.get_rates()
 
-        for selector in [
-            '//*[contains(@class, "footer")]',
-            '//*[contains(@class, "header")]',
-            '//*[contains(@class, "nav")]',
-            '//*[contains(@id, "footer")]',
-            '//*[contains(@id, "header")]',
-            '//*[contains(@id, "nav")]',
-        ]:
-            for e in body.xpath(selector):
-                if e.getparent() is not None:
-                    e.getparent().remove(e)
+    def get_circuit_stats(self) -> Dict:
+        """各域名当前的熔断状态（closed / open / half_open）"""
+        return self.req_mgr.circuit_breaker.get_states()
 
-        # 提取 innerHTML
-        content = "".join(
-            html.tostring(child, encoding="unicode", method="html")
-            for child in body.getchildren()
-        )
+    def is_host_available(self, url: str) -> bool:
+        """url 所在站点未处于熔断冷却期"""
+        breaker = self.req_mgr.circuit_breaker
+        return breaker.is_available(breaker.host_of(url))
+
+    async def close(self):
+        await self.req_mgr.close()
 
-        # 精简空白字符
-        content = re.sub(r">\s*\n\s*<", "><", content)
-        content = re.sub(r">\s{2,}<", "><", content)
-        return content.strip()
-    
-    
     async def __aenter__(self):
-        await self.req_mgr._ensure_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.req_mgr.close()
+        await self.close()
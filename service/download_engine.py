@@ -0,0 +1,180 @@
+# service/download_engine.py
+import asyncio
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional
+
+from service.telemetry import Metrics, get_logger
+
+logger = get_logger("download")
+
+
+class ChapterDownloadEngine:
+    """
+    章节并发下载引擎
+    - fetch 阶段：N 个 worker 同时抓取章节，完成顺序不定
+    - parse 阶段：整理正文文本，失败章节生成占位内容
+    - write 阶段：按章节原始顺序交给 sink，乱序完成的章节暂存在重排窗口中
+    - 各阶段之间使用有界队列，单章失败或超时不会拖住其余章节
+    - 可选 gate：每章抓取前先进入该异步上下文（如多书调度器分配的并发名额）
+    """
+    DEFAULT_CONCURRENCY = 8
+    DEFAULT_CHAPTER_TIMEOUT = 120
+
+    def __init__(
+        self,
+        fetch_func: Callable[[str], Awaitable[Dict]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        window: Optional[int] = None,
+        chapter_timeout: Optional[float] = DEFAULT_CHAPTER_TIMEOUT,
+        gate: Optional[Callable[[], AsyncContextManager]] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.fetch_func = fetch_func
+        self.metrics = metrics or Metrics.get_instance()
+        self.gate = gate
+        self.concurrency = max(1, concurrency)
+        # 重排窗口：最多允许领先“下一个待写章节”多少章，控制内存占用
+        self.window = max(self.concurrency, window or self.concurrency * 4)
+        self.chapter_timeout = chapter_timeout
+
+        self._next_write = 0
+        self._window_cond: Optional[asyncio.Condition] = None
+        self.stats = {"total": 0, "success": 0, "failed": 0}
+
+    async def run(
+        self,
+        chapters: List[Dict],
+        sink: Callable[[int, Dict, str], Awaitable[Any]],
+        start: int = 0,
+    ) -> Dict[str, int]:
+        """
+        并发下载 chapters，并按顺序调用 sink(idx, chapter, text)
+        start 为第一章在全书中的序号（增量追加时不从 0 开始）
+
+        Returns:
+            dict: 下载统计 {"total", "success", "failed"}
+        """
+        self._next_write = start
+        self._window_cond = asyncio.Condition()
+        self.stats = {"total": len(chapters), "success": 0, "failed": 0}
+
+        fetch_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def feeder():
+            for idx, chap in enumerate(chapters, start):
+                await fetch_queue.put((idx, chap))
+            for _ in range(self.concurrency):
+                await fetch_queue.put(None)
+
+        async def fetch_worker():
+            while True:
+                job = await fetch_queue.get()
+                if job is None:
+                    break
+                idx, chap = job
+                await self._wait_window(idx)
+                if self.gate:
+                    async with self.gate():
+                        data, error = await self._fetch_chapter(chap)
+                else:
+                    data, error = await self._fetch_chapter(chap)
+                await parse_queue.put((idx, chap, data, error))
+
+        async def parse_worker():
+            while True:
+                job = await parse_queue.get()
+                if job is None:
+                    break
+                idx, chap, data, error = job
+                text = self.format_chapter(idx, chap, data, error)
+                await write_queue.put((idx, chap, text))
+            await write_queue.put(None)
+
+        async def write_worker():
+            pending: Dict[int, tuple] = {}
+            while True:
+                job = await write_queue.get()
+                if job is None:
+                    break
+                idx, chap, text = job
+                pending[idx] = (chap, text)
+                while self._next_write in pending:
+                    chap, text = pending.pop(self._next_write)
+                    await sink(self._next_write, chap, text)
+                    await self._advance_window()
+
+        feed = asyncio.create_task(feeder())
+        fetchers = [asyncio.create_task(fetch_worker()) for _ in range(self.concurrency)]
+
+        async def close_fetch_stage():
+            # 全部抓取 worker 退出后通知解析阶段结束
+            await asyncio.gather(feed, *fetchers)
+            await parse_queue.put(None)
+
+        tasks = [
+            feed, *fetchers,
+            asyncio.create_task(close_fetch_stage()),
+            asyncio.create_task(parse_worker()),
+            asyncio.create_task(write_worker()),
+        ]
+        # 所有阶段一起监督：任何一个失败（如 sink 写盘出错）立即取消其余阶段并把异常抛给调用方，
+        # 否则上游会卡在已满的队列上永远等不到结束
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task in done and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return self.stats
+
+    async def _fetch_chapter(self, chap: Dict):
+        """抓取单章，超时和异常都转换为 error 返回，不向外抛出"""
+        try:
+            if self.chapter_timeout:
+                data = await asyncio.wait_for(self.fetch_func(chap["url"]), self.chapter_timeout)
+            else:
+                data = await self.fetch_func(chap["url"])
+            if not data or not data.get("content"):
+                return data, "正文为空"
+            return data, None
+        except asyncio.TimeoutError:
+            return None, f"超时（{self.chapter_timeout}s）"
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__
+
+    def format_chapter(self, idx: int, chap: Dict, data: Optional[Dict], error: Optional[str]) -> str:
+        """把抓取结果整理成最终写入的章节文本，并记录统计"""
+        if error:
+            self.stats["failed"] += 1
+            self.metrics.inc("chapters_total", result="failed")
+            logger.warning("❌ 抓取章节失败: %s - %s", chap["title"], error)
+            return self.render_chapter(idx, chap, None)
+
+        self.stats["success"] += 1
+        self.metrics.inc("chapters_total", result="success")
+        logger.debug("✅ 成功下载章节：%s", data.get("title") or chap["title"])
+        return self.render_chapter(idx, chap, data)
+
+    @staticmethod
+    def render_chapter(idx: int, chap: Dict, data: Optional[Dict]) -> str:
+        """章节文本格式，data 为 None 时生成失败占位"""
+        if not data:
+            return f"\n\n第{idx + 1}章 {chap['title']}\n\n【抓取失败】\n"
+        title = data.get("title") or chap["title"]
+        content = data.get("content", "").replace("\\n", "\n").replace("\r", "").strip()
+        return f"\n{title}\n\n{content}\n"
+
+    async def _wait_window(self, idx: int):
+        async with self._window_cond:
+            await self._window_cond.wait_for(lambda: idx < self._next_write + self.window)
+
+    async def _advance_window(self):
+        async with self._window_cond:
+            self._next_write += 1
+            self._window_cond.notify_all()
@@ -0,0 +1,122 @@
+# service/encoding_resolver.py
+import codecs
+import re
+from typing import Dict, Optional
+
+# Content-Type: text/html; charset=gbk
+_CHARSET_HEADER_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+# <meta charset="gbk"> 或 <meta http-equiv="Content-Type" content="text/html; charset=gbk">
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+
+class EncodingResolver:
+    """
+    页面编码判定器（每个页面只判定一次，不做试错解码）
+    判定顺序：
+      1. BOM
+      2. 站点配置中显式填写的 SiteConfig.encoding（可覆盖声明错误的响应头 / <meta>）
+      3. 响应头 Content-Type 中的 charset
+      4. 页面前几 KB 中的 <meta charset> 声明
+      5. 该 host 之前校验得出的编码
+      6. 仍无法确定时校验一次 UTF-8，失败按 GB18030 处理
+    未填写 site.encoding 时从第 3 步开始按页面声明判定；只有第 6 步需要解码整页，其结果按 host 缓存
+    """
+    SNIFF_BYTES = 4096
+
+    # gb2312 / gbk 均为 gb18030 的子集，统一按超集解码，避免生僻字乱码
+    _ALIASES = {
+        "gb2312": "gb18030",
+        "gbk": "gb18030",
+        "x-gbk": "gb18030",
+        "utf8": "utf-8",
+    }
+
+    _BOMS = (
+        (codecs.BOM_UTF8, "utf-8"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"),
+    )
+
+    _instance: Optional["EncodingResolver"] = None
+
+    def __init__(self):
+        self._site_encodings: Dict[str, str] = {}
+        self._host_cache: Dict[str, str] = {}
+
+    @classmethod
+    def get_instance(cls) -> "EncodingResolver":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def normalize(cls, encoding: Optional[str]) -> Optional[str]:
+        """统一编码名称，无法识别的编码返回 None"""
+        if not encoding:
+            return None
+        name = encoding.strip().lower()
+        name = cls._ALIASES.get(name, name)
+        try:
+            codecs.lookup(name)
+        except LookupError:
+            return None
+        return name
+
+    def configure(self, host: str, encoding: Optional[str]):
+        """登记站点配置中显式填写的编码（优先于页面声明），未填写（None）时不登记，完全按页面声明判定"""
+        normalized = self.normalize(encoding)
+        if normalized:
+            self._site_encodings[host.lower()] = normalized
+        else:
+            self._site_encodings.pop(host.lower(), None)
+
+    def resolve(self, host: str, content: bytes, content_type: Optional[str] = None) -> str:
+        host = (host or "").lower()
+        encoding = self.bom(content) or self._site_encodings.get(host)
+        if encoding:
+            return encoding
+
+        encoding = self.declared(content, content_type) or self._host_cache.get(host)
+        if encoding:
+            return encoding
+
+        encoding = self.guess(content)
+        self._host_cache[host] = encoding
+        return encoding
+
+    def declared(self, content: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        """页面自己声明的编码（BOM、响应头 charset、<meta charset>），都没有时返回 None"""
+        encoding = self.bom(content)
+        if encoding:
+            return encoding
+        if content_type:
+            match = _CHARSET_HEADER_RE.search(content_type)
+            encoding = self.normalize(match.group(1)) if match else None
+            if encoding:
+                return encoding
+        match = _META_CHARSET_RE.search(content[:self.SNIFF_BYTES])
+        return self.normalize(match.group(1).decode("ascii", "ignore")) if match else None
+
+    @classmethod
+    def bom(cls, content: bytes) -> Optional[str]:
+        for bom, encoding in cls._BOMS:
+            if content.startswith(bom):
+                return encoding
+        return None
+
+    def sniff(self, content: bytes) -> str:
+        """不看响应头时的判定：BOM / <meta charset>，否则校验 UTF-8"""
+        return self.declared(content) or self.guess(content)
+
+    @staticmethod
+    def guess(content: bytes) -> str:
+        try:
+            content.decode("utf-8")
+            return "utf-8"
+        except UnicodeDecodeError:
+            return "gb18030"
+
+    @staticmethod
+    def decode(content: bytes, encoding: str) -> str:
+        """按已判定的编码解码一次，个别坏字节用替换符代替"""
+        return content.decode(encoding, errors="replace")
@@ -0,0 +1,232 @@
+# service/extraction_plan.py
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urldefrag, urljoin
+
+from lxml import etree, html
+
+from service.content_filter import ContentFilter
+
+
+class ExtractionPlan:
+    """
+    站点抽取计划
+    - 把配置中 novel / chapters / content 三部分的 XPath 字符串一次性编译为 lxml.etree.XPath
+    - 表达式写错在加载时就抛出 ValueError，而不是抓到某一页才报错
+    - 同一份配置只编译一次：调用方持有编译好的计划，每页只做解析和求值；
+      按配置内容缓存的计划每个线程最多保留 MAX_CACHED_PLANS 份（LRU）
+    - filters 编译为 ContentFilter，正文抽取前删除广告节点、抽取后过滤段落
+    - 计划与解析器缓存按线程隔离（lxml 解析器不能跨线程共用），其他线程通过 local() 取本线程的同配置计划；
+      pickle 时只传配置与缓存键，进程池工作进程内按键取缓存
+    """
+    SECTIONS = {
+        "novel": ("title", "author", "update_time", "status", "intro", "cover", "category"),
+        "chapters": ("container", "item", "title", "url", "more_url"),
+        "content": ("container", "title", "text", "next_page"),
+    }
+
+    MAX_CACHED_PLANS = 32
+
+    _local = threading.local()   # plans: 配置键 -> 抽取计划（LRU）；parsers: 编码 -> 解析器
+
+    def __init__(self, config: Dict[str, Any], key: Optional[str] = None):
+        self.config = config
+        self.key = key or self.config_key(config)
+        self._thread_id = threading.get_ident()
+        self.novel_cfg = config.get("novel") or {}
+        self.chapters_cfg = config.get("chapters") or {}
+        self.content_cfg = config.get("content") or {}
+
+        self.novel = self._compile_section("novel", self.novel_cfg)
+        self.chapters = self._compile_section("chapters", self.chapters_cfg)
+        self.content = self._compile_section("content", self.content_cfg)
+        self.filter = ContentFilter(config.get("filters"))
+
+    @classmethod
+    def config_key(cls, config: Dict[str, Any]) -> str:
+        """配置中影响抽取的部分序列化后的缓存键"""
+        return json.dumps(
+            {name: config.get(name) for name in (*cls.SECTIONS, "filters")},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+
+    @classmethod
+    def for_config(cls, config: Dict[str, Any]) -> "ExtractionPlan":
+        """按配置内容取缓存的抽取计划，没有则编译；每次都要序列化配置，热路径上应持有返回的计划"""
+        return cls.for_key(cls.config_key(config), config)
+
+    @classmethod
+    def for_key(cls, key: str, config: Dict[str, Any]) -> "ExtractionPlan":
+        """按已算好的缓存键取当前线程的抽取计划，没有则编译"""
+        plans = cls._thread_cache("plans", OrderedDict)
+        plan = plans.get(key)
+        if plan is None:
+            plan = cls(config, key)
+            plans[key] = plan
+            if len(plans) > cls.MAX_CACHED_PLANS:
+                plans.popitem(last=False)
+        else:
+            plans.move_to_end(key)
+        return plan
+
+    def local(self) -> "ExtractionPlan":
+        """当前线程可用的同配置计划：在本线程编译的直接返回，否则取本线程的缓存"""
+        if self._thread_id == threading.get_ident():
+            return self
+        return self.for_key(self.key, self.config)
+
+    def __reduce__(self):
+        # 编译好的 XPath 不能 pickle，进程池只传配置与键，工作进程内按键取缓存或重新编译
+        return _plan_for_key, (self.key, self.config)
+
+    @classmethod
+    def _thread_cache(cls, name: str, factory=dict) -> Dict:
+        cache = getattr(cls._local, name, None)
+        if cache is None:
+            cache = factory()
+            setattr(cls._local, name, cache)
+        return cache
+
+    def _compile_section(self, section: str, cfg: Dict[str, Any]) -> Dict[str, Optional[etree.XPath]]:
+        compiled = {}
+        for field in self.SECTIONS[section]:
+            compiled[field] = self.compile(cfg.get(field), f"{section}.{field}")
+        return compiled
+
+    @staticmethod
+    def compile(expr: Optional[str], field: str = "") -> Optional[etree.XPath]:
+        """编译单条 XPath，空表达式返回 None，语法错误抛出 ValueError"""
+        if not expr or not expr.strip():
+            return None
+        try:
+            return etree.XPath(expr.strip(), smart_strings=False)
+        except etree.XPathSyntaxError as e:
+            raise ValueError(f"XPath 规则无效 [{field}]: {expr}\n{e}")
+
+    # ---------- 解析 ----------
+
+    @classmethod
+    def parse(cls, content: bytes, encoding: str = "utf-8"):
+        """把原始字节解析为 lxml 文档树，空文档返回 None"""
+        if not content:
+            return None
+        parsers = cls._thread_cache("parsers")
+        parser = parsers.get(encoding)
+        if parser is None:
+            parser = html.HTMLParser(encoding=encoding, recover=True)
+            parsers[encoding] = parser
+        try:
+            return etree.fromstring(content, parser=parser)
+        except (etree.ParserError, ValueError):
+            return None
+
+    # ---------- 求值工具 ----------
+
+    @staticmethod
+    def _to_text(item) -> str:
+        if isinstance(item, str):
+            return item
+        if isinstance(item, etree._Element):
+            return "".join(item.itertext())
+        return str(item)
+
+    @classmethod
+    def _values(cls, xpath: Optional[etree.XPath], node) -> List:
+        if xpath is None or node is None:
+            return []
+        try:
+            result = xpath(node)
+        except etree.XPathEvalError:
+            return []
+        return result if isinstance(result, list) else [result]
+
+    @classmethod
+    def _first(cls, xpath: Optional[etree.XPath], node, default: str = "") -> str:
+        values = cls._values(xpath, node)
+        return cls._to_text(values[0]) if values else default
+
+    @staticmethod
+    def _link(item) -> str:
+        """链接类字段：命中元素时取其 href，命中字符串时原样返回"""
+        if isinstance(item, etree._Element):
+            return item.get("href", "")
+        return str(item)
+
+    # ---------- 抽取 ----------
+
+    def extract_novel_info(self, root) -> Dict[str, str]:
+        plan, cfg = self.novel, self.novel_cfg
+        author_raw = self._first(plan["author"], root)
+        author_split = cfg.get("author_split") or "："
+        update_raw = self._first(plan["update_time"], root)
+        update_split = cfg.get("update_split") or "："
+        return {
+            "title": self._first(plan["title"], root).strip(),
+            "author": author_raw.split(author_split)[-1].strip() if author_raw else "",
+            "intro": self._first(plan["intro"], root).strip(),
+            "update_time": update_raw.split(update_split)[-1].strip(),
+        }
+
+    def extract_chapters(self, root, base_url: str = "") -> List[Dict[str, str]]:
+        plan = self.chapters
+        chapters = []
+        for container in self._values(plan["container"], root):
+            for item in self._values(plan["item"], container):
+                title = "".join(self._to_text(t) for t in self._values(plan["title"], item)).strip()
+                if not title:
+                    continue
+                href = self._first(plan["url"], item).strip()
+                if not href:
+                    continue
+                chapters.append({"title": title, "url": urljoin(base_url, href)})
+        return chapters
+
+    def extract_index_pages(self, root, page_url: str = "") -> List[str]:
+        """
+        目录分页链接（chapters.more_url），按文档顺序去重并转为绝对地址；
+        未开启 chapters.pagination 或未配置 more_url 时返回空列表
+        """
+        if not self.chapters_cfg.get("pagination"):
+            return []
+        links = []
+        for item in self._values(self.chapters["more_url"], root):
+            href = self._link(item).strip()
+            if not href or href.startswith(("#", "javascript:")):
+                continue
+            link = urldefrag(urljoin(page_url, href))[0]
+            if link not in links:
+                links.append(link)
+        return links
+
+    def extract_content(self, root) -> Dict[str, Any]:
+        """
+        抽取正文页：先删除 remove_html 节点，容器只求值一次，段落经过滤规则清洗
+
+        Returns:
+            dict: {"title": str, "paragraphs": List[str], "next_page": Optional[str]}
+        """
+        plan = self.content
+        self.filter.clean_tree(root)
+        containers = self._values(plan["container"], root)
+
+        title = ""
+        paragraphs = []
+        for container in containers:
+            if not title:
+                title = self._first(plan["title"], container).strip()
+            paragraphs.extend(self._to_text(p) for p in self._values(plan["text"], container))
+
+        next_values = self._values(plan["next_page"], root)
+        next_page = self._link(next_values[0]) if next_values else None
+        return {
+            "title": title,
+            "paragraphs": self.filter.filter_paragraphs(paragraphs),
+            "next_page": next_page or None,
+        }
+
+
+def _plan_for_key(key: str, config: Dict[str, Any]) -> ExtractionPlan:
+    """反序列化入口（模块级函数才能被 pickle 引用）"""
+    return ExtractionPlan.for_key(key, config)
@@ -1,28 +1,86 @@
 # fetch_utils.py
 import random
 import asyncio
+import time
+from email.utils import parsedate_to_datetime
 from typing import Optional, List, Dict
-import aiohttp
+from urllib.parse import urlparse
 import async_timeout
+from service.circuit_breaker import CircuitBreaker
+from service.encoding_resolver import EncodingResolver
+from service.http_cache import HttpCache
+from service.rate_limiter import RateLimiter
+from service.session_manager import SessionManager
+from service.telemetry import Metrics, get_logger
+from service.transport import (Transport, TransportConnectionError, TransportError, TransportSelector,
+                               create_transport)
+
+logger = get_logger("fetch")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头：秒数或 HTTP 日期，返回需要等待的秒数，无法解析返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
 
 class RequestManager:
     """
     异步请求管理器（改进版）
-    - session 生命周期完全统一
-    - 支持并发控制、代理轮换、UA 伪装
+    - session 生命周期完全统一，可接入进程级 SessionManager 复用连接池
+    - 底层传输可插拔（service.transport）：按站点配置 site.transport 选择 aiohttp 或 httpx（HTTP/2），
+      重试、缓存、编码判定与统计对两者完全一致
+    - 支持并发控制、按域名自适应限速（RateLimiter）、代理轮换、UA 伪装
     - 支持单任务异常容错
+    - 可选磁盘缓存（HttpCache），过期条目通过条件请求重新验证
+    - 每个页面只判定一次编码（EncodingResolver），可直接返回原始字节供 lxml 解析
+    - 每次请求记录耗时、字节数、状态码与重试次数（Metrics，按 host 聚合），编码判定与解码各自计时
+    - 失败按指数退避重试并遵守 Retry-After；按域名熔断（CircuitBreaker），站点宕机时快速失败
     """
     DEFAULT_TIMEOUT = 10
     DEFAULT_RETRY = 3
+    RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524})
+    SPECULATIVE_MISS_STATUS = frozenset({404, 410})   # 预测的 URL 不存在时的正常响应
+    BACKOFF_BASE = 0.5         # 首次重试前的等待上限（秒），之后每次翻倍
+    BACKOFF_CAP = 8.0
+    MAX_RETRY_AFTER = 60.0     # Retry-After 超过该值时不再等待，本次请求直接失败
 
-    def __init__(self, proxies: Optional[List[str]] = None, max_concurrent: int = 5):
+    def __init__(self, proxies: Optional[List[str]] = None, max_concurrent: int = 5,
+                 session_manager: Optional[SessionManager] = None,
+                 cache: Optional[HttpCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 metrics: Optional[Metrics] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[str] = None):
         self.proxies = proxies or []
-        self._session: Optional[aiohttp.ClientSession] = None
+        self.metrics = metrics or Metrics.get_instance()
+        self.session_manager = session_manager
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.encoding_resolver = EncodingResolver.get_instance()
+        # transport 指定时所有站点都用它，否则按 TransportSelector 中登记的站点配置选择
+        self.transport = transport
+        self.transport_selector = TransportSelector.get_instance()
+        self._transports: Dict[str, Transport] = {}
         self._semaphore = asyncio.Semaphore(max_concurrent)
 
-    async def _ensure_session(self):
-        if not self._session or self._session.closed:
-            self._session = aiohttp.ClientSession()
+    def _transport_for(self, host: str) -> Transport:
+        name = self.transport or self.transport_selector.get(host)
+        transport = self._transports.get(name)
+        if transport is None:
+            transport = self._transports[name] = create_transport(name, self.session_manager)
+        return transport
 
     def build_headers(self, url: str) -> Dict[str, str]:
         user_agents = [
@@ -41,48 +99,176 @@ class RequestManager:
             "Referer": url,
         }
 
-    async def _fetch_one(self, url: str, retry: int) -> Optional[str]:
-        await self._ensure_session()
+    async def _fetch_raw(self, url: str, retry: int, speculative: bool = False,
+                         use_cache: bool = True) -> Optional[Dict]:
+        """
+        抓取原始字节并判定编码，不做解码
+        - 可重试错误（超时、连接失败、408/429/5xx）按指数退避 + 随机抖动重试，服务端给出 Retry-After 时以其为准
+        - 不可重试错误（404/403/410 等其他 4xx、非法 URL 等）立即放弃
+        - host 熔断期间直接返回 None，不发请求
+        - speculative=True 表示预测出来的 URL（如章节子页）：只请求一次，404/410 是预期结果，
+          记 DEBUG 日志，状态记为 speculative_miss，不计入限速器的错误统计
+        - use_cache=False 时不读写磁盘缓存（只抓一次的页面，缓存只会徒增 I/O）
+
+        Returns:
+            dict: {"content": bytes, "encoding": str}，失败返回 None
+        """
         headers = self.build_headers(url)
         proxy = random.choice(self.proxies) if self.proxies else None
 
+        metrics = self.metrics
+        host = urlparse(url).hostname or ""
+        transport = self._transport_for(host)
+
+        cache = self.cache if use_cache else None
+        cached = await cache.get(url) if cache else None
+        if cached:
+            if cached["fresh"]:
+                metrics.inc("http_cache_total", host=host, result="fresh")
+                return self._raw_result(url, cached["content"], cached.get("content_type"))
+            headers.update(cache.conditional_headers(cached))
+
+        if speculative:
+            retry = 1
         for attempt in range(1, retry + 1):
+            if not self.circuit_breaker.allow(url):
+                metrics.inc("http_requests_total", host=host, status="circuit_open")
+                logger.debug("[Async] %s 已熔断，跳过: %s", host, url)
+                return None
+            if attempt > 1:
+                metrics.inc("http_retries_total", host=host)
+            status = "error"
+            healthy: Optional[bool] = None     # 交给熔断器：主机是否正常响应
+            retryable = False
+            retry_after: Optional[float] = None
+            start = time.perf_counter()
             try:
-                async with self._semaphore:
+                # 先过域名限速，再占全局并发槽，避免等令牌时占着其他站点的名额
+                async with self.rate_limiter.limit(url) as limit, self._semaphore:
+                    # 请求耗时从拿到并发槽开始算，不含限速排队
+                    start = time.perf_counter()
                     async with async_timeout.timeout(self.DEFAULT_TIMEOUT):
-                        async with self._session.get(url, headers=headers, proxy=proxy) as resp:
-                            resp.raise_for_status()
-                            content = await resp.read()
-                            return self.handle_encoding_bytes(content)
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                print(f"[Async] 请求失败 {attempt}/{retry}: {url} - {e}")
-                await asyncio.sleep(random.uniform(0.5, 1.2))
+                        resp = await transport.fetch(url, headers, proxy)
+                    status = resp.status
+                    if speculative and status in self.SPECULATIVE_MISS_STATUS:
+                        status = "speculative_miss"
+                    else:
+                        limit.status = status
+                if resp.status == 304 and cached:
+                    healthy = True
+                    metrics.inc("http_cache_total", host=host, result="revalidated")
+                    await cache.refresh(url, resp.headers)
+                    return self._raw_result(url, cached["content"], cached.get("content_type"))
+                if resp.status < 400:
+                    healthy = True
+                    metrics.inc("http_response_bytes_total", len(resp.content), host=host)
+                    if cache:
+                        await cache.store(url, resp.content, resp.headers)
+                    return self._raw_result(url, resp.content, resp.headers.get("Content-Type"))
+
+                if status == "speculative_miss":
+                    healthy = True
+                    logger.debug("[Async] 预测页不存在: %s - HTTP %d", url, resp.status)
+                    return None
+                retryable = resp.status in self.RETRYABLE_STATUS
+                # 5xx 计入熔断；429 只是限流，交给限速器处理；其余 4xx 说明主机正常
+                healthy = False if resp.status >= 500 else (None if resp.status == 429 else True)
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                logger.warning("[Async] 请求失败 %d/%d: %s - HTTP %d%s", attempt, retry, url, resp.status,
+                               "" if retryable else "（不重试）")
+            except asyncio.CancelledError:
+                # 预测子页被取消等情况，不算失败
+                status = "cancelled"
+                raise
+            except asyncio.TimeoutError:
+                status = "timeout"
+                healthy, retryable = False, True
+                logger.warning("[Async] 请求超时 %d/%d: %s", attempt, retry, url)
+            except TransportConnectionError as e:
+                healthy, retryable = False, True
+                logger.warning("[Async] 请求失败 %d/%d: %s - %s", attempt, retry, url, e)
+            except TransportError as e:
+                # 非法 URL、重定向过多等，重试无意义
+                logger.warning("[Async] 请求失败（不重试）: %s - %s", url, e)
             except Exception as e:
-                print(f"[Async] 未知异常 {url}: {e}")
+                logger.error("[Async] 未知异常 %s: %s", url, e)
+            finally:
+                self.circuit_breaker.record(url, healthy)
+                metrics.inc("http_requests_total", host=host, status=status)
+                metrics.observe("http_request_seconds", time.perf_counter() - start,
+                                host=host, transport=transport.name)
+
+            if not retryable or attempt >= retry:
                 break
+            if retry_after is not None:
+                if retry_after > self.MAX_RETRY_AFTER:
+                    logger.warning("[Async] %s 要求 %.0fs 后重试，超过上限，放弃: %s", host, retry_after, url)
+                    break
+                # 同一 host 的其他请求也一起等待
+                self.rate_limiter.get(host).pause(retry_after)
+            await asyncio.sleep(self.backoff_delay(attempt, retry_after))
         return None
 
+    @classmethod
+    def backoff_delay(cls, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        第 attempt 次失败后的等待时间：BACKOFF_BASE * 2^(attempt-1)，上限 BACKOFF_CAP，取 [一半, 全部] 间的随机值；
+        有 Retry-After 时不少于它
+        """
+        ceiling = min(cls.BACKOFF_CAP, cls.BACKOFF_BASE * 2 ** (attempt - 1))
+        delay = random.uniform(ceiling / 2, ceiling)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _raw_result(self, url: str, content: bytes, content_type: Optional[str]) -> Dict:
+        host = urlparse(url).hostname or ""
+        start = time.perf_counter()
+        encoding = self.encoding_resolver.resolve(host, content, content_type)
+        self.metrics.observe("decode_seconds", time.perf_counter() - start, stage="detect")
+        return {"content": content, "encoding": encoding}
+
+    async def _fetch_one(self, url: str, retry: int, speculative: bool = False,
+                         use_cache: bool = True) -> Optional[str]:
+        raw = await self._fetch_raw(url, retry, speculative, use_cache)
+        if raw is None:
+            return None
+        start = time.perf_counter()
+        text = self.handle_encoding_bytes(raw["content"], raw["encoding"])
+        self.metrics.observe("decode_seconds", time.perf_counter() - start, stage="decode")
+        return text
+
     async def request_async(self, url: str, retry: Optional[int] = None) -> Optional[str]:
         retry = retry or self.DEFAULT_RETRY
         return await self._fetch_one(url, retry)
 
-    async def request_batch(self, urls: List[str], retry: Optional[int] = None) -> List[Dict]:
+    async def request_batch(self, urls: List[str], retry: Optional[int] = None, raw: bool = False,
+                            speculative: bool = False, use_cache: bool = True) -> List[Dict]:
+        """
+        批量抓取
+        - raw=False: 返回 {"url", "html"}，html 为解码后的字符串
+        - raw=True:  返回 {"url", "content", "encoding"}，字节直接交给 lxml 解析，省去解码
+        - speculative / use_cache: 见 _fetch_raw
+        """
         retry = retry or self.DEFAULT_RETRY
-        await self._ensure_session()
 
         async def safe_fetch(url):
-            html = await self._fetch_one(url, retry)
+            if raw:
+                result = await self._fetch_raw(url, retry, speculative, use_cache) or {"content": None, "encoding": None}
+                return {"url": url, **result}
+            html = await self._fetch_one(url, retry, speculative, use_cache)
             return {"url": url, "html": html}
 
         results = await asyncio.gather(*(safe_fetch(u) for u in urls), return_exceptions=False)
         return results
 
     async def close(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        # 共享 session 由 SessionManager 关闭，各传输层只关闭自己创建的连接
+        transports, self._transports = self._transports, {}
+        for transport in transports.values():
+            await transport.close()
 
-    def handle_encoding_bytes(self, content: bytes) -> str:
+    def handle_encoding_bytes(self, content: bytes, encoding: Optional[str] = None) -> str:
+        if encoding:
+            return EncodingResolver.decode(content, encoding)
         for enc in ("utf-8", "gbk", "gb2312"):
             try:
                 return content.decode(enc)
@@ -91,7 +277,6 @@ class RequestManager:
         return content.decode("utf-8", errors="ignore")
 
     async def __aenter__(self):
-        await self._ensure_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -0,0 +1,172 @@
+# service/html_cleaner.py
+import re
+from typing import Dict, Iterable, List
+
+from lxml import etree, html
+
+_BLANK_LINES_RE = re.compile(r">\s*\n\s*<")
+_BLANK_RUNS_RE = re.compile(r">\s{2,}<")
+
+
+class HtmlCleaner:
+    """
+    单次遍历的 HTML 清理器（生成 XPath 规则前精简页面）
+    - 只遍历一次 body 子树，同时完成：删除噪音标签、注释、header/footer/nav 区块，以及容器内重复链接去重
+    - 噪音节点连同其后的 tail 文本一并删除，与原先逐条 XPath 删除的效果一致
+    - 重复链接：同一容器（div/ul/ol/nav/section/article，取最近的一层）内属性与文本完全相同的 <a>，
+      保留第一个，其余替换为链接文字
+    """
+    NOISE_TAGS = frozenset({"script", "style", "link", "meta", "noscript", "input"})
+    NOISE_MARKERS = ("footer", "header", "nav")
+    CONTAINER_TAGS = frozenset({"div", "ul", "ol", "nav", "section", "article"})
+
+    def __init__(self, noise_tags: Iterable[str] = NOISE_TAGS, noise_markers: Iterable[str] = NOISE_MARKERS,
+                 remove_noise: bool = True, dedupe_links: bool = True):
+        self.noise_tags = frozenset(noise_tags)
+        self.noise_markers = tuple(noise_markers)
+        self.remove_noise = remove_noise
+        self.dedupe_links = dedupe_links
+
+    # ---------- 解析与输出 ----------
+
+    @staticmethod
+    def parse_body(html_content: str):
+        """解析 HTML（整页或片段）并返回 body 元素，失败返回 None"""
+        if not html_content:
+            return None
+        try:
+            parser = html.HTMLParser(recover=True, encoding="utf-8")
+            tree = html.document_fromstring(html_content, parser=parser)
+        except Exception:
+            return None
+        return tree.find(".//body")
+
+    @staticmethod
+    def serialize(body) -> str:
+        """输出 body 的 innerHTML（不含 body 自身的前导文本），并精简标签间空白"""
+        content = "".join(
+            html.tostring(child, encoding="unicode", method="html")
+            for child in body
+        )
+        content = _BLANK_LINES_RE.sub("><", content)
+        content = _BLANK_RUNS_RE.sub("><", content)
+        return content.strip()
+
+    def clean_html(self, html_content: str) -> str:
+        """解析、清理并输出 body 内容，无法解析或没有 body 时返回空字符串"""
+        body = self.parse_body(html_content)
+        if body is None:
+            return ""
+        self.clean(body)
+        return self.serialize(body)
+
+    # ---------- 单次遍历 ----------
+
+    def _is_noise(self, el) -> bool:
+        if el.tag is etree.Comment:
+            return True
+        if not isinstance(el.tag, str):
+            return False
+        if el.tag in self.noise_tags:
+            return True
+        cls = el.get("class")
+        if cls and any(marker in cls for marker in self.noise_markers):
+            return True
+        el_id = el.get("id")
+        return bool(el_id) and any(marker in el_id for marker in self.noise_markers)
+
+    def clean(self, body) -> Dict[str, int]:
+        """
+        就地清理 body 子树
+
+        Returns:
+            dict: {"removed": 删除的节点数, "unlinked": 去掉的重复链接数}
+        """
+        removed: List = []
+        duplicates: List = []
+
+        # (元素, 所在容器的已见链接集合)；命中噪音的节点不再展开子树
+        stack = [(child, None) for child in reversed(body)]
+        while stack:
+            el, seen = stack.pop()
+            if self.remove_noise and self._is_noise(el):
+                removed.append(el)
+                continue
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue
+            if self.dedupe_links and tag == "a" and seen is not None and len(el) == 0 and el.get("href") is not None:
+                key = (tuple(el.attrib.items()), el.text)
+                if key in seen:
+                    duplicates.append(el)
+                    continue
+                seen.add(key)
+            if tag in self.CONTAINER_TAGS:
+                seen = set()
+            stack.extend((child, seen) for child in reversed(el))
+
+        for el in removed:
+            el.getparent().remove(el)
+        for el in duplicates:
+            self._unwrap(el)
+        return {"removed": len(removed), "unlinked": len(duplicates)}
+
+    @staticmethod
+    def _unwrap(el):
+        """把链接替换为其文字，保留后面的 tail"""
+        parent = el.getparent()
+        text = (el.text or "") + (el.tail or "")
+        prev = el.getprevious()
+        if prev is not None:
+            prev.tail = (prev.tail or "") + text
+        else:
+            parent.text = (parent.text or "") + text
+        parent.remove(el)
+
+
+def clean_body(html_content: str, dedupe_links: bool = True) -> str:
+    """清理整页 HTML 并输出 body 内容"""
+    return HtmlCleaner(dedupe_links=dedupe_links).clean_html(html_content)
+
+
+def compress_links(html_content: str) -> str:
+    """
+    只做容器内重复链接去重（不删除噪音节点），输出完整文档（保留 doctype 与 <head>）
+    - 容器与链接的匹配方式与原 NovelService.compress_html 相同，直接在原字符串上替换，未改动的部分逐字节保留
+    - 同一容器内按 href 计数，与该 href 第一次出现完全相同的后续链接替换为链接文字
+    - 每个容器只扫描一次链接并一次拼接输出，不再对每个重复 href 重新搜索整个容器
+    """
+    return _CONTAINER_RE.sub(_dedupe_container, html_content)
+
+
+_CONTAINER_RE = re.compile(
+    r"(<div[^>]*>.*?</div>|<ul[^>]*>.*?</ul>|<ol[^>]*>.*?</ol>|<nav[^>]*>.*?</nav>"
+    r"|<section[^>]*>.*?</section>|<article[^>]*>.*?</article>)",
+    re.DOTALL,
+)
+_LINK_RE = re.compile(r"<a\s+[^>]*href=(['\"])(.*?)\1[^>]*>.*?</a>", re.DOTALL)
+_LINK_TEXT_RE = re.compile(r">([^<]*)</a>")
+
+
+def _dedupe_container(match) -> str:
+    container = match.group(0)
+    first: Dict[str, str] = {}      # href -> 第一次出现时的完整链接
+    pieces: List[str] = []
+    last = 0
+    for link in _LINK_RE.finditer(container):
+        full, href = link.group(0), link.group(2)
+        if href not in first:
+            first[href] = full
+            continue
+        if full != first[href]:
+            continue
+        text = _LINK_TEXT_RE.search(full)
+        if text is None:
+            continue
+        pieces.append(container[last:link.start()])
+        pieces.append(text.group(1))
+        last = link.end()
+    if not pieces:
+        return container
+    pieces.append(container[last:])
+    return "".join(pieces)
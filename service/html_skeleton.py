@@ -0,0 +1,166 @@
+# service/html_skeleton.py
+import re
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree, html
+
+from service.html_cleaner import HtmlCleaner
+
+_CJK_RE = re.compile(r"[　-鿿＀-￯]")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 字 1 token，其余约 4 字符 1 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class HtmlSkeleton:
+    """
+    面向 XPath 生成 Agent 的 HTML 结构骨架
+    - 连续重复的同结构兄弟节点（如上千个 <dd><a>）只保留前 keep 个和最后 1 个，中间用注释标出省略数量
+    - 文本中的连续空白压缩，过长的文本节点截断并注明原长度；class 与 id 全部保留，style / on* 事件属性删除，其余过长属性值截断
+    - 标签层级与属性不变，基于骨架生成的 XPath 可直接用于完整页面（不依赖位置下标即可）
+    - 超出 token_budget 时逐级收紧（保留条数、文本长度），仍超出则截断输出
+    """
+    DEFAULT_TOKEN_BUDGET = 6000
+    MIN_RUN = 4                # 至少连续多少个同结构兄弟节点才折叠
+    MAX_ATTR_LEN = 80
+    # 逐级收紧的 (保留条数, 文本最大长度)
+    LEVELS: List[Tuple[int, int]] = [(3, 60), (2, 30), (1, 16), (1, 8)]
+    HEAD_TAGS = ("title", "meta")
+    # 提示词中对骨架格式的说明
+    PROMPT_NOTE = (
+        "（HTML 已精简为结构骨架：连续重复的同结构节点只保留前几个和最后一个，省略处用注释标出数量，"
+        "过长文本已截断；class、id 与标签层级保持原样。生成的 XPath 会用于完整页面，请不要依赖位置下标。）"
+    )
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+
+    # ---------- 对外接口 ----------
+
+    def reduce(self, html_content: str) -> str:
+        """把整页或 body 片段精简为不超过 token 预算的结构骨架"""
+        result = ""
+        for keep, max_text in self.LEVELS:
+            result = self.build(html_content, keep, max_text)
+            if estimate_tokens(result) <= self.token_budget:
+                return result
+        return self._truncate(result)
+
+    def build(self, html_content: str, keep: int = 3, max_text: int = 60) -> str:
+        """按给定的保留条数与文本长度生成骨架（不考虑预算）"""
+        body = HtmlCleaner.parse_body(html_content)
+        if body is None:
+            return ""
+        head = self._head_summary(body)
+        self._collapse(body, keep)
+        self._shorten(body, max_text)
+        return head + HtmlCleaner.serialize(body)
+
+    # ---------- 折叠重复结构 ----------
+
+    @classmethod
+    def _signature(cls, el, depth: int = 2) -> Optional[tuple]:
+        """节点结构签名：标签 + class + 子节点的签名（限定深度），忽略文本与 id"""
+        if not isinstance(el.tag, str):
+            return None
+        children = ()
+        if depth > 0:
+            children = tuple(
+                sig for sig in (cls._signature(child, depth - 1) for child in el) if sig is not None
+            )
+        return el.tag, el.get("class", ""), children
+
+    def _collapse(self, root, keep: int):
+        stack = [root]
+        while stack:
+            parent = stack.pop()
+            children = [child for child in parent if isinstance(child.tag, str)]
+            runs = self._runs(children)
+            for start, end in runs:
+                run = children[start:end]
+                if len(run) < max(self.MIN_RUN, keep + 2):
+                    continue
+                dropped = run[keep:-1]
+                marker = etree.Comment(f" 省略 {len(dropped)} 个与上面结构相同的 <{run[0].tag}>（共 {len(run)} 个） ")
+                dropped[0].addprevious(marker)
+                for el in dropped:
+                    # 被省略节点的 tail 一并丢弃，它们通常只是空白或分隔符
+                    parent.remove(el)
+            stack.extend(child for child in parent if isinstance(child.tag, str))
+
+    def _runs(self, children) -> List[Tuple[int, int]]:
+        runs = []
+        start = 0
+        signatures = [self._signature(child) for child in children]
+        for i in range(1, len(children) + 1):
+            if i == len(children) or signatures[i] != signatures[start]:
+                if i - start > 1:
+                    runs.append((start, i))
+                start = i
+        return runs
+
+    # ---------- 文本与属性 ----------
+
+    @staticmethod
+    def _cut(text: Optional[str], limit: int) -> Optional[str]:
+        """连续空白压成一个空格，超过 limit 的文本截断并注明原长度"""
+        if not text:
+            return text
+        text = _SPACES_RE.sub(" ", text)
+        stripped = text.strip()
+        if len(stripped) <= limit:
+            return text
+        return f"{stripped[:limit]}…(共{len(stripped)}字)"
+
+    def _shorten(self, root, max_text: int):
+        for el in root.iter():
+            el.tail = self._cut(el.tail, max_text)
+            if not isinstance(el.tag, str):
+                continue
+            el.text = self._cut(el.text, max_text)
+            for name in list(el.attrib):
+                if name == "style" or name.startswith("on"):
+                    del el.attrib[name]
+                elif name not in ("class", "id") and len(el.attrib[name]) > self.MAX_ATTR_LEN:
+                    el.attrib[name] = el.attrib[name][:self.MAX_ATTR_LEN] + "…"
+
+    def _head_summary(self, body) -> str:
+        """整页输入时保留 <title> 与 <meta>（如 og:image），片段输入时为空"""
+        document = body.getparent()
+        head = document.find("head") if document is not None else None
+        if head is None:
+            return ""
+        parts = []
+        for el in head:
+            if el.tag in self.HEAD_TAGS and (el.tag == "title" or el.get("property") or el.get("name")):
+                el.tail = None
+                parts.append(html.tostring(el, encoding="unicode", method="html"))
+        return "".join(parts)
+
+    def _truncate(self, text: str) -> str:
+        """预算内按字符截断，截断点回退到最近的标签边界"""
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(text[:mid]) <= self.token_budget:
+                low = mid
+            else:
+                high = mid - 1
+        cut = text.rfind(">", 0, low) + 1 or low
+        return text[:cut] + f"\n<!-- 超出长度预算，后续 {len(text) - cut} 字符已省略 -->"
+
+    def stats(self, html_content: str) -> Dict[str, int]:
+        """原始与精简后的字符数、估算 token 数"""
+        reduced = self.reduce(html_content)
+        return {
+            "chars": len(html_content),
+            "tokens": estimate_tokens(html_content),
+            "reduced_chars": len(reduced),
+            "reduced_tokens": estimate_tokens(reduced),
+        }
@@ -0,0 +1,246 @@
+# service/http_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Mapping
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from service.telemetry import get_logger
+
+logger = get_logger("cache")
+
+
+class HttpCache:
+    """
+    磁盘 HTTP 响应缓存
+    - 以规范化 URL 的 sha256 为键，正文（原始字节）与元数据分文件存放
+    - 记录 ETag / Last-Modified，过期后用 If-None-Match / If-Modified-Since 重新验证
+    - 支持按站点（host）设置 TTL，总大小超过上限后按 LRU 淘汰
+    - 读写接口是协程，磁盘 I/O 在线程中完成，不阻塞事件循环
+    """
+    DEFAULT_DIR = "./cache/http"
+    DEFAULT_TTL = 0                       # 0 表示每次都重新验证（命中时通常是 304）
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+    _instance: Optional["HttpCache"] = None
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_DIR,
+        default_ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        site_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.site_ttls: Dict[str, float] = dict(site_ttls or {})
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        # key -> {"size": int, "last_access": float}
+        self._index: Optional[Dict[str, Dict[str, float]]] = None
+        self._total_bytes = 0
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "HttpCache":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    # ---------- 键与路径 ----------
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """规范化 URL：小写协议与主机、去掉默认端口和锚点、查询参数排序"""
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port
+        if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+            host = f"{host}:{port}"
+        path = parts.path or "/"
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((scheme, host, path, query, ""))
+
+    def cache_key(self, url: str) -> str:
+        return hashlib.sha256(self.normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".body", base + ".json"
+
+    def set_ttl(self, host: str, ttl: float):
+        """设置某个站点的缓存有效期（秒）"""
+        self.site_ttls[host.lower()] = ttl
+
+    def get_ttl(self, url: str) -> float:
+        host = (urlsplit(url).hostname or "").lower()
+        return self.site_ttls.get(host, self.default_ttl)
+
+    # ---------- 读写 ----------
+    # 文件读写都通过 asyncio.to_thread 放到线程中执行，索引只在事件循环线程中修改
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目，返回 {"content", "etag", "last_modified", "content_type", "stored_at", "fresh"}，
+        不存在或已损坏时返回 None
+        """
+        await self._load_index()
+        key = self.cache_key(url)
+        if key not in self._index:
+            self.stats["misses"] += 1
+            return None
+        try:
+            meta = await asyncio.to_thread(self._read_entry, key)
+        except (OSError, ValueError):
+            await self._remove(key)
+            self.stats["misses"] += 1
+            return None
+
+        if key in self._index:
+            self._index[key]["last_access"] = time.time()
+        meta["fresh"] = time.time() - meta.get("stored_at", 0) < self.get_ttl(url)
+        if meta["fresh"]:
+            self.stats["hits"] += 1
+        return meta
+
+    def conditional_headers(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def store(self, url: str, content: bytes, headers: Optional[Mapping[str, str]] = None):
+        """写入响应正文及校验头（临时文件 + rename，避免读到半截文件）"""
+        headers = headers or {}
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        await self._load_index()
+        key = self.cache_key(url)
+        meta = {
+            "url": self.normalize_url(url),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type"),
+            "stored_at": time.time(),
+            "size": len(content),
+        }
+        try:
+            await asyncio.to_thread(self._write_entry, key, content, meta)
+        except OSError as e:
+            logger.warning("[HttpCache] 写入缓存失败 %s: %s", url, e)
+            return
+
+        old = self._index.get(key)
+        if old:
+            self._total_bytes -= old["size"]
+        self._index[key] = {"size": len(content), "last_access": time.time()}
+        self._total_bytes += len(content)
+        self.stats["stores"] += 1
+        await self._evict()
+
+    async def refresh(self, url: str, headers: Optional[Mapping[str, str]] = None):
+        """收到 304 后刷新条目的存储时间，服务端给了新的校验头则一并更新"""
+        headers = headers or {}
+        key = self.cache_key(url)
+        try:
+            await asyncio.to_thread(self._refresh_meta, key, headers.get("ETag"), headers.get("Last-Modified"))
+        except (OSError, ValueError) as e:
+            logger.warning("[HttpCache] 刷新缓存失败 %s: %s", url, e)
+            return
+        self.stats["revalidated"] += 1
+
+    def _read_entry(self, key: str) -> Dict[str, Any]:
+        body_path, meta_path = self._paths(key)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            meta["content"] = f.read()
+        return meta
+
+    def _write_entry(self, key: str, content: bytes, meta: Dict[str, Any]):
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        self._atomic_write(body_path, content)
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def _refresh_meta(self, key: str, etag: Optional[str], last_modified: Optional[str]):
+        _, meta_path = self._paths(key)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["stored_at"] = time.time()
+        meta["etag"] = etag or meta.get("etag")
+        meta["last_modified"] = last_modified or meta.get("last_modified")
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    # ---------- 索引与淘汰 ----------
+
+    async def _load_index(self):
+        """首次使用时扫描缓存目录，重建大小与访问时间索引"""
+        if self._index is not None:
+            return
+        index = await asyncio.to_thread(self._scan_index)
+        if self._index is None:     # 并发的首次调用只采用先完成的扫描结果
+            self._index = index
+            self._total_bytes = sum(entry["size"] for entry in index.values())
+
+    def _scan_index(self) -> Dict[str, Dict[str, float]]:
+        index = {}
+        if not os.path.isdir(self.cache_dir):
+            return index
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".body"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                key = name[:-len(".body")]
+                index[key] = {"size": st.st_size, "last_access": st.st_mtime}
+        return index
+
+    async def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        victims = []
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1]["last_access"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._drop(key)
+            victims.append(key)
+            self.stats["evictions"] += 1
+        await asyncio.to_thread(self._delete_files, victims)
+
+    async def _remove(self, key: str):
+        self._drop(key)
+        await asyncio.to_thread(self._delete_files, [key])
+
+    def _drop(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry["size"]
+
+    def _delete_files(self, keys):
+        for key in keys:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        # 同一条目可能被两个线程同时写，临时文件按线程区分
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
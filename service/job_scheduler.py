@@ -0,0 +1,262 @@
+# service/job_scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from service.circuit_breaker import CircuitBreaker, HostCircuit
+from service.novel_service import NovelService
+from service.telemetry import get_logger
+
+logger = get_logger("scheduler")
+
+
+class DownloadJob:
+    """一本书的下载任务：目录页 URL、输出目标（书名 + 作者）、优先级与进度统计"""
+
+    def __init__(self, url: str, novel_name: Optional[str] = None, author: Optional[str] = None,
+                 priority: int = 0, update: bool = True, storage: str = "txt"):
+        self.url = url
+        self.host = (urlparse(url).hostname or "").lower()
+        self.novel_name = novel_name
+        self.author = author
+        self.priority = priority
+        self.update = update
+        self.storage = storage
+
+        self.status = "pending"       # pending / running / done / failed
+        self.total = 0                # 目录章节数
+        self.processed = 0            # 已处理章节数（含失败与日志命中）
+        self.in_flight = 0            # 当前占用的并发名额
+        self.output: Optional[str] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """章节/秒"""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "novel": self.novel_name,
+            "host": self.host,
+            "priority": self.priority,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "in_flight": self.in_flight,
+            "elapsed": round(self.elapsed, 2),
+            "chapters_per_sec": round(self.throughput, 2),
+            "error": self.error,
+        }
+
+
+class ChapterSlotPool:
+    """
+    章节级并发名额
+    - 全局名额 max_concurrency 与每个 host 的名额 per_host 同时生效
+    - 有空闲名额时按 (优先级高, 占用名额少, 先到) 的顺序分配：
+      同优先级的任务轮流拿名额，章节多的大书不会把小书饿死
+    - 熔断中的站点不分配名额，名额让给其他站点；冷却结束（half_open）时只放行一章做探测
+    """
+
+    def __init__(self, max_concurrency: int, per_host: int, circuit_breaker: Optional[CircuitBreaker] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host = max(1, per_host)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.get_instance()
+        self.in_flight = 0
+        self.host_in_flight: Dict[str, int] = {}
+        self._waiters: List[tuple] = []       # (job, seq, future)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _has_room(self, host: str) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        in_flight = self.host_in_flight.get(host, 0)
+        state = self.circuit_breaker.state(host)
+        if state == HostCircuit.OPEN:
+            self._schedule_wakeup(self.circuit_breaker.retry_in(host))
+            return False
+        if state == HostCircuit.HALF_OPEN:
+            return in_flight == 0
+        return in_flight < self.per_host
+
+    def _schedule_wakeup(self, delay: float):
+        """熔断站点的章节在等待，冷却结束时重新分配一次名额"""
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            return
+        self._wakeup = asyncio.get_running_loop().call_later(delay + 0.01, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _grant(self, job: DownloadJob):
+        self.in_flight += 1
+        self.host_in_flight[job.host] = self.host_in_flight.get(job.host, 0) + 1
+        job.in_flight += 1
+
+    def _dispatch(self):
+        if not self._waiters or self.in_flight >= self.max_concurrency:
+            return
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        # 每次分配后占用数变化，需要重新排序
+        while self._waiters and self.in_flight < self.max_concurrency:
+            self._waiters.sort(key=lambda w: (-w[0].priority, w[0].in_flight, w[1]))
+            for i, (job, _, future) in enumerate(self._waiters):
+                if self._has_room(job.host):
+                    del self._waiters[i]
+                    self._grant(job)
+                    future.set_result(None)
+                    break
+            else:
+                return
+
+    async def acquire(self, job: DownloadJob):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((job, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已分配但调用方被取消，归还名额
+                self.release(job)
+            raise
+
+    def release(self, job: DownloadJob):
+        self.in_flight -= 1
+        self.host_in_flight[job.host] -= 1
+        job.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, job: DownloadJob):
+        await self.acquire(job)
+        try:
+            yield
+        finally:
+            self.release(job)
+            job.processed += 1
+
+
+class DownloadScheduler:
+    """
+    多书下载调度器
+    - 任务按优先级排队，最多 max_active_jobs 本书同时处于下载状态
+    - 每本书仍由 NovelService 的下载引擎抓取，但每章抓取前要从 ChapterSlotPool 领取名额，
+      全局并发与每个站点的并发都不会超出预算
+    - 每个任务记录进度与吞吐（章节/秒），report() 随时可查
+    - 空闲的 worker 优先领取站点未熔断的任务
+    """
+    DEFAULT_MAX_CONCURRENCY = 32
+    DEFAULT_PER_HOST = 8
+    DEFAULT_MAX_ACTIVE_JOBS = 8
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                 max_active_jobs: int = DEFAULT_MAX_ACTIVE_JOBS,
+                 circuit_breaker: Optional[CircuitBreaker] = None, **service_kwargs):
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.get_instance()
+        self.pool = ChapterSlotPool(max_concurrency, per_host, self.circuit_breaker)
+        self.per_host = per_host
+        self.max_active_jobs = max(1, max_active_jobs)
+        self.service_kwargs = service_kwargs     # 透传给 NovelService（session_manager、cache 等）
+        self.jobs: List[DownloadJob] = []
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+
+    def submit(self, url: str, novel_name: Optional[str] = None, author: Optional[str] = None,
+               priority: int = 0, update: bool = True, storage: str = "txt") -> DownloadJob:
+        """
+        提交一本书
+
+        Args:
+            url: 目录页 URL
+            novel_name / author: 输出文件名，不填时从目录页的小说信息中读取
+            priority: 数值越大越优先
+            update: True 时按章节清单增量更新，False 时完整下载
+            storage: 输出后端，txt 或 store（单文件章节库）
+        """
+        job = DownloadJob(url, novel_name, author, priority, update, storage)
+        self.jobs.append(job)
+        heapq.heappush(self._queue, (-priority, next(self._seq), job))
+        return job
+
+    async def run(self) -> List[Dict]:
+        """执行队列中的全部任务（运行中提交的任务也会被执行），返回各任务的统计"""
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.max_active_jobs)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                if not task.done():
+                    task.cancel()
+        return self.report()
+
+    async def _worker(self):
+        while self._queue:
+            await self._run_job(self._next_job())
+
+    def _next_job(self) -> DownloadJob:
+        """按优先级取任务，跳过站点正在熔断的任务；全部熔断时仍取优先级最高的"""
+        ordered = sorted(self._queue)
+        entry = next((e for e in ordered if self.circuit_breaker.is_available(e[2].host)), ordered[0])
+        self._queue.remove(entry)
+        heapq.heapify(self._queue)
+        return entry[2]
+
+    async def _run_job(self, job: DownloadJob):
+        job.status = "running"
+        job.started_at = time.monotonic()
+        service = None
+        try:
+            service = NovelService(job.url, max_concurrent=self.per_host, **self.service_kwargs)
+            if not job.novel_name:
+                info = await service.fetch_novel_info(job.url)
+                job.novel_name = info.get("title") or job.host
+                job.author = job.author or info.get("author", "")
+            job.author = job.author or ""
+
+            chapters = await service.fetch_chapter_list(job.url)
+            job.total = len(chapters)
+            gate = lambda: self.pool.slot(job)
+            if job.update:
+                job.output = await service.update_novel(
+                    job.novel_name, job.author, job.url,
+                    concurrency=self.per_host, gate=gate, chapters=chapters, storage=job.storage,
+                )
+            else:
+                job.output = await service.download_novel(
+                    job.novel_name, job.author, chapters, concurrency=self.per_host, gate=gate, storage=job.storage,
+                )
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+            logger.error("❌ 任务失败 %s: %s", job.url, job.error)
+        finally:
+            job.finished_at = time.monotonic()
+            if service:
+                await service.close()
+
+        if job.status == "done":
+            logger.info("📊 《%s》处理 %d/%d 章，用时 %.1fs，%.2f 章/秒",
+                        job.novel_name, job.processed, job.total, job.elapsed, job.throughput)
+
+    def report(self) -> List[Dict]:
+        """各任务当前的进度、吞吐与所在站点的熔断状态"""
+        return [{**job.snapshot(), "circuit": self.circuit_breaker.state(job.host)} for job in self.jobs]
@@ -1,145 +1,264 @@
 # service/novel_service.py
 import asyncio
-from collections import defaultdict
-import re
-from urllib.parse import urljoin
-from parsel import Selector
-from service.config_service import ConfigService
+from urllib.parse import urldefrag, urljoin, urlparse
+from service.config_service import ConfigRegistry
 from service.crawl_service import CrawlService
+from service.chapter_journal import ChapterJournal
+from service.chapter_manifest import ChapterManifest
+from service.chapter_store import ChapterStore
+from service.download_engine import ChapterDownloadEngine
+from service.encoding_resolver import EncodingResolver
+from service.extraction_plan import ExtractionPlan
+from service.html_cleaner import compress_links
+from service.http_cache import HttpCache
+from service.novel_writer import StreamingNovelWriter
+from service.page_predictor import PaginationPredictor
+from service.parse_pool import ParsePool
+from service.rate_limiter import RateLimiter
+from service.session_manager import SessionManager
+from service.telemetry import Metrics, get_logger
+from service.transport import TransportSelector
 import os
-import aiofiles
 from lxml import html
 from lxml.etree import XPathError, ParserError
 
+logger = get_logger("novel")
+
 
 class NovelService:
-    def __init__(self, url: str):
+    MAX_CHAPTER_PAGES = 100    # 单章分页上限，防止站点分页链接出错时无限翻页
+    MAX_INDEX_PAGES = 200      # 目录分页上限
+    STORAGE_BACKENDS = ("txt", "store")    # 输出后端：整本 TXT / 单文件章节库（ChapterStore）
+
+    def __init__(self, url: str, session_manager: SessionManager = None, max_concurrent: int = 8,
+                 cache: HttpCache = None, registry: ConfigRegistry = None, parse_pool: ParsePool = None):
+        cache = cache or HttpCache.get_instance()
         if url:
             self.url = url
-            self.config = ConfigService().load_config(url)
-            self.base_url = self.config.get("base_url", "")
+            # 配置来自常驻注册表，构建服务不再读盘
+            registry = registry or ConfigRegistry.get_instance()
+            self.template = registry.get(url)
+            if self.template is None:
+                raise FileNotFoundError(f"未找到站点配置: {url}")
+            self.config = registry.get_config(url)
+            self.base_url = self.template.site.base_url
+            # XPath 规则按站点预编译，写错的表达式在这里就会报错
+            self.plan = ExtractionPlan.for_config(self.config)
+
+            site_cfg = self.template.site
+            host = urlparse(url).hostname or ""
+
+            # 站点可在 site.cache_ttl 中指定缓存有效期（秒）
+            if site_cfg.cache_ttl is not None:
+                cache.set_ttl(host, site_cfg.cache_ttl)
+
+            # 按 site.delay 初始化该域名的限速
+            RateLimiter.get_instance().configure(host, site_cfg.delay)
+
+            # 显式填写的 site.encoding 优先于响应头与 <meta charset>，未填写时按页面声明判定
+            EncodingResolver.get_instance().configure(host, site_cfg.encoding)
+
+            # site.transport 选择该站点的传输层（httpx 可走 HTTP/2 多路复用）
+            TransportSelector.get_instance().configure(host, site_cfg.transport)
+
+        # 整个服务生命周期共用一个 CrawlService，底层连接池由 SessionManager 统一管理
+        self.crawl = CrawlService(
+            max_concurrent=max_concurrent,
+            session_manager=session_manager or SessionManager.get_instance(),
+            cache=cache,
+        )
+        # 章节内分页规律按站点学习，进程内共享
+        self.page_predictor = PaginationPredictor.get_instance()
+        # 目录页与正文页的解析放到工作池中，不占用事件循环
+        self.parse_pool = parse_pool or ParsePool.get_instance()
+        self.metrics = Metrics.get_instance()
+        self.metrics.register_buckets("chapter_pages", Metrics.SIZE_BUCKETS)
+
+    async def close(self):
+        await self.crawl.close()
+
+    async def _fetch_raw(self, url: str, retry: int = 3, speculative: bool = False, use_cache: bool = True):
+        """
+        抓取页面原始字节与判定好的编码，失败或空页面返回 None
+        speculative / use_cache 见 RequestManager._fetch_raw
+        """
+        result = await self.crawl.async_fetch_single(url, retry=retry, raw=True, speculative=speculative,
+                                                     use_cache=use_cache)
+        if not result or not result.get("content"):
+            return None
+        return result
+
+    async def _fetch_tree(self, url: str, retry: int = 3):
+        """抓取页面，原始字节连同判定好的编码直接交给 lxml 解析，不经过 str"""
+        result = await self._fetch_raw(url, retry)
+        if result is None:
+            return None
+        return ExtractionPlan.parse(result["content"], result["encoding"])
+
+    async def _fetch_content_page(self, url: str, retry: int = 3, speculative: bool = False):
+        """
+        抓取正文页并在解析池中抽取，返回 {"title", "paragraphs", "next_page"}
+        正文页每本书只下载一次，不走磁盘缓存；缓存留给更新时需要反复抓取的详情页与目录页
+        """
+        result = await self._fetch_raw(url, retry, speculative, use_cache=False)
+        if result is None:
+            return None
+        return await self.parse_pool.extract_content(result["content"], result["encoding"], self.plan)
+
+    async def _fetch_chapter_page(self, url: str):
+        """抓取目录页并在解析池中抽取，返回 {"chapters", "index_pages"}"""
+        result = await self._fetch_raw(url)
+        if result is None:
+            return None
+        return await self.parse_pool.extract_chapters(result["content"], result["encoding"], self.plan, url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
         
     # 抓取章节列表页
     async def fetch_chapter_list(self, url: str):
-        async with CrawlService() as crawl:
-            result = await crawl.async_fetch_single(url)
-            html = result.get("html", "") if result else ""
-
-            if not html:
-                return {}
-
-            sel = Selector(html)
-
-            # 获取章节列表
-            chapters_cfg = self.config["chapters"]
-            all_chapters = []
-            containers = sel.xpath(chapters_cfg["container"])
-            
-            for container in containers:
-                items = container.xpath(chapters_cfg["item"])
-                for a in items:
-                    title_parts = a.xpath(chapters_cfg["title"]).getall()
-                    chap_title = "".join(title_parts).strip()
-                    if not chap_title:
-                        continue
-
-                    href = a.xpath(chapters_cfg["url"]).get(default="").strip()
-                    if not href:
-                        continue
-
-                    full_url = urljoin(self.base_url, href)
-
-                    all_chapters.append({
-                        "title": chap_title,
-                        "url": full_url
-                    })
-        
-
-            # 去重（防止分页重复）
-            unique_chapters = []
-            seen_urls = set()
-            for ch in all_chapters:
-                if ch["url"] not in seen_urls:
-                    unique_chapters.append(ch)
-                    seen_urls.add(ch["url"])
-            all_chapters = unique_chapters
-            
-            return all_chapters
+        return [ch async for ch in self.iter_chapter_list(url)]
+
+    # 逐条产出章节目录（含目录分页）
+    # 第一页上 more_url 命中的所有目录页立即并发抓取，后续页上新发现的目录页也随时加入；
+    # 各页按发现顺序（即页序）合并，前面的页解析完就先产出，不必等全部目录页下载结束
+    async def iter_chapter_list(self, url: str):
+        url = urldefrag(url)[0]
+        pages = [url]                                   # 按页序排列的目录页
+        tasks = {url: asyncio.ensure_future(self._fetch_chapter_page(url))}
+        seen_urls = set()                               # 去重（防止分页重复）
+
+        try:
+            for page_url in pages:                      # 遍历过程中 pages 会继续增长
+                page = await tasks[page_url]
+                if page is None:
+                    logger.warning("[⚠] 目录页抓取失败，已跳过: %s", page_url)
+                    continue
+
+                for link in page["index_pages"]:
+                    if link not in tasks and len(pages) < self.MAX_INDEX_PAGES:
+                        pages.append(link)
+                        tasks[link] = asyncio.ensure_future(self._fetch_chapter_page(link))
+
+                for ch in page["chapters"]:
+                    if ch["url"] not in seen_urls:
+                        seen_urls.add(ch["url"])
+                        yield ch
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        if len(pages) > 1:
+            logger.info("📑 目录共 %d 页，%d 章", len(pages), len(seen_urls))
 
 
     # 抓取小说信息页
     async def fetch_novel_info(self, url: str):
-        async with CrawlService() as crawl:
-            result = await crawl.async_fetch_single(url)
-            html = result.get("html", "") if result else ""
-
-            if not html:
-                return {}
-
-            sel = Selector(html)
-            novel_cfg = self.config["novel"]
-
-            title = sel.xpath(novel_cfg["title"]).get(default="").strip()
-            author_raw = sel.xpath(novel_cfg["author"]).get(default="")
-            author_split = novel_cfg.get("author_split", "：")
-            author = author_raw.split(author_split)[-1].strip() if author_raw else ""
-
-            intro = sel.xpath(novel_cfg["intro"]).get(default="").strip()
-            update_raw = sel.xpath(novel_cfg["update_time"]).get(default="")
-            update_split = novel_cfg.get("update_split", "：")
-            update_time = update_raw.split(update_split)[-1].strip()
-
-            return {
-                "title": title,
-                "author": author,
-                "intro": intro,
-                "update_time": update_time,
-            }
+        root = await self._fetch_tree(url)
+        if root is None:
+            return {}
+        return self.plan.extract_novel_info(root)
 
 
     # 抓取单章正文页（含分页）
+    # 站点的分页规律已知时（如 123.html -> 123_2.html），按预取深度并行抓取预测的后续子页；
+    # 每页解析出的真实下一页链接与预测对比，不符则取消在途的预测请求，改按真实链接继续
+    # 整章（含全部子页）记为一个 chapter 追踪区间：耗时、子页数、字数
     async def fetch_chapter_content(self, url: str):
-        async with CrawlService() as crawl:
-            content_cfg = self.config["content"]
-            filters = self.config.get("filters", {})
-            chapter_content = []
-            title = ""
-            base_chapter_id = url.split("/")[-1].split(".")[0]  # 当前章节编码
-
-            while url:
-                result = await crawl.async_fetch_single(url)
-                html = result.get("html", "") if result else ""
-                if not html:
+        host = urlparse(url).hostname or ""
+        with self.metrics.span("chapter", labels={"host": host}, url=url) as span:
+            result = await self._fetch_chapter_pages(url, span)
+        self.metrics.observe("chapter_pages", span.attrs["pages"], host=host)
+        return result
+
+    async def _fetch_chapter_pages(self, url: str, span):
+        chapter_content = []
+        title = ""
+        chapter_url = url
+        base_chapter_id = url.split("/")[-1].split(".")[0]  # 当前章节编码
+        predictor = self.page_predictor
+
+        tasks = {}          # url -> 抓取任务（真实页与预测页共用，命中预测时不重复请求）
+        speculative = set() # 以预测身份发出的请求
+        visited = set()     # 已处理的分页 URL，防止分页链接成环
+        page_no = 1
+        page = None
+
+        def fetch(page_url, guess=False):
+            task = tasks.get(page_url)
+            if task is None:
+                # 预测的子页可能不存在：不重试，404 不算失败
+                task = asyncio.ensure_future(self._fetch_content_page(page_url, speculative=guess))
+                tasks[page_url] = task
+                if guess:
+                    speculative.add(page_url)
+            return task
+
+        try:
+            while url and url not in visited and page_no <= self.MAX_CHAPTER_PAGES:
+                visited.add(url)
+
+                # 当前页之后的 depth 个子页提前发出请求
+                for ahead in range(1, predictor.depth(chapter_url, page_no) + 1):
+                    guess = predictor.predict(chapter_url, page_no + ahead)
+                    if guess and guess not in visited:
+                        fetch(guess, guess=True)
+
+                page = await fetch(url)
+                if page is None and url in speculative:
+                    # 预测请求不重试，确认是真实页后按正常重试次数再抓一次
+                    del tasks[url]
+                    speculative.discard(url)
+                    page = await fetch(url)
+                if page is None:
                     break
 
-                sel = Selector(html)
-
-                # 提取标题，只做一次
+                # 标题只取第一页
                 if not title:
-                    title_sel = sel.xpath(content_cfg["container"])
-                    title = title_sel.xpath(content_cfg["title"]).get(default="").strip()
+                    title = page["title"]
+
+                # 正文段落已由抽取计划完成过滤
+                chapter_content.extend(page["paragraphs"])
+
+                # 获取下一页（相对链接按当前页解析）
+                next_page = page["next_page"]
+                next_url = urljoin(url, next_page) if next_page and base_chapter_id in next_page else None
 
-                # 提取正文
-                content_sel = sel.xpath(content_cfg["container"])
-                paragraphs = content_sel.xpath(content_cfg["text"]).getall()
-                for p in paragraphs:
-                    p = p.strip()
-                    if p and not any(f in p for f in filters.get("regex", [])):
-                        chapter_content.append(p)
+                if next_url and page_no == 1:
+                    predictor.learn(chapter_url, next_url)
+                predicted = predictor.predict(chapter_url, page_no + 1)
+                if predicted and next_url != predicted:
+                    # 预测失误（或本章已结束）：丢弃在途的预测请求
+                    if next_url:
+                        predictor.record_miss(chapter_url)
+                    for task_url in list(speculative):
+                        task = tasks[task_url]
+                        if task_url != next_url and not task.done():
+                            task.cancel()
+                            del tasks[task_url]
+                            speculative.discard(task_url)
 
-                # 获取下一页
-                next_page = sel.xpath(content_cfg.get("next_page", "")).get()
-                if next_page and base_chapter_id in next_page:
-                    url = urljoin(self.base_url, next_page)
-                else:
-                    url = None  # 本章分页结束
+                logger.debug("当前章节抓取: %s，下一页: %s", url, next_page)
+                url = next_url
+                page_no += 1
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
 
-                print(f"当前章节抓取: {url}，下一页: {next_page}")
+        if url and url in visited and page is not None:
+            logger.warning("[⚠] 章节分页出现循环，已停止: %s", url)
+        predictor.record_chapter(chapter_url, len(visited))
+        span.set(pages=len(visited), paragraphs=len(chapter_content), ok=bool(chapter_content))
 
-            return {
-                "title": title,
-                "content": "\n".join(chapter_content)
-            }
+        return {
+            "title": title,
+            "content": "\n".join(chapter_content)
+        }
 
 
 
@@ -163,86 +282,185 @@ class NovelService:
 
 
             
+    # 每本书的输出文件（按输出后端区分）、下载日志与章节清单
+    @classmethod
+    def _book_paths(cls, novel_name: str, author: str, storage: str = "txt"):
+        if storage not in cls.STORAGE_BACKENDS:
+            raise ValueError(f"不支持的输出后端: {storage}（可选 {', '.join(cls.STORAGE_BACKENDS)}）")
+        base = f"./output/{novel_name}_{author}"
+        output = f"{base}.db" if storage == "store" else f"{base}.txt"
+        return output, f"{base}.journal", f"{base}.manifest.json"
+
+    @staticmethod
+    def _open_writer(storage: str, path: str, fsync_interval: int):
+        """txt 后端按顺序追加写文件；store 后端每章一行写入章节库，两者接口一致"""
+        if storage == "store":
+            return ChapterStore(path, commit_interval=fsync_interval)
+        return StreamingNovelWriter(path, fsync_interval=fsync_interval)
+
+    # 先查日志再联网的抓取函数，顺带记录每章正文哈希供章节清单使用
+    def _journal_fetcher(self, journal: ChapterJournal, hashes: dict):
+        async def fetch_with_journal(url):
+            record = await journal.get(url)
+            if record:
+                hashes[url] = ChapterManifest.content_hash(record.get("content"))
+                return record
+            data = await self.fetch_chapter_content(url)
+            if data and data.get("content"):
+                await journal.record(url, data)
+                hashes[url] = ChapterManifest.content_hash(data["content"])
+            return data
+        return fetch_with_journal
+
     # 异步下载整本小说（多章节合并）
-    # 直接调用 fetch_chapter_content()
-    async def download_novel(self, novel_name: str, author: str, chapters: list[dict]):
+    # 由 ChapterDownloadEngine 并发调用 fetch_chapter_content()，每章完成即写入日志，
+    # 再按原始顺序流式写入输出文件；中断后再次运行会跳过日志中已完成的章节
+    # storage="store" 时输出到单文件章节库（按章压缩、按序号随机读取），可再导出 TXT / EPUB
+    async def download_novel(self, novel_name: str, author: str, chapters: list[dict],
+                             concurrency: int = ChapterDownloadEngine.DEFAULT_CONCURRENCY,
+                             window: int = None,
+                             fsync_interval: int = StreamingNovelWriter.DEFAULT_FSYNC_INTERVAL,
+                             gate=None, storage: str = "txt"):
         
         os.makedirs("./output", exist_ok=True)
-        file_path = f"./output/{novel_name}_{author}.txt"
-
-        print(f"📘 开始下载小说《{novel_name}》（共 {len(chapters)} 章）...")
-
-        merged_text = [f"《{novel_name}》 —— 作者：{author}\n\n"]
-
-        # 串行抓取（不并发，更安全）
-        for idx, chap in enumerate(chapters, start=1):
-            print(f"⏬ 下载章节：{chap['title']} - {chap['url']}")
-            try:
-                data = await self.fetch_chapter_content(chap["url"])
-                title = data.get("title") or chap["title"]
-                content = data.get("content", "").replace("\\n", "\n").replace("\r", "").strip()
-                merged_text.append(f"\n{title}\n\n{content}\n")
-                print(f"✅ 成功下载章节：{title}")
-            except Exception as e:
-                print(f"❌ 抓取章节失败: {chap['title']} - {e}")
-                merged_text.append(f"\n\n第{idx}章 {chap['title']}\n\n【抓取失败】\n")
-
-        # === 写入文件 ===
-        async with aiofiles.open(file_path, "w", encoding="utf-8") as f:
-            await f.write("".join(merged_text))
-
-        print(f"✅ 小说《{novel_name}》下载完成：{file_path}")
+        file_path, journal_path, manifest_path = self._book_paths(novel_name, author, storage)
+        journal = ChapterJournal(journal_path)
+        done = journal.load()
+
+        logger.info("📘 开始下载小说《%s》（共 %d 章，已完成 %d 章，并发 %d）...", novel_name, len(chapters), done, concurrency)
+
+        # 引擎的重排窗口保证写入器只需缓冲少量章节，内存占用与书的长度无关
+        hashes = {}
+        engine = ChapterDownloadEngine(self._journal_fetcher(journal, hashes), concurrency=concurrency,
+                                       window=window, gate=gate)
+        writer = self._open_writer(storage, file_path, fsync_interval)
+
+        async def write_chapter(idx, chap, text):
+            await writer.write(idx, text)
+
+        await writer.open(f"《{novel_name}》 —— 作者：{author}\n\n")
+        async with writer:
+            if storage == "store":
+                await writer.set_meta_async(title=novel_name, author=author, source=self.url)
+            stats = await engine.run(chapters, write_chapter)
+            if storage == "store":
+                # 重建时目录可能变短，删掉多出来的旧章节
+                await writer.truncate_async(len(chapters))
+
+        # 清单记录本次写入的章节，供 update_novel 增量更新
+        ChapterManifest(manifest_path).save(chapters, hashes)
+
+        logger.info("✅ 小说《%s》下载完成：%s（成功 %d 章，失败 %d 章）", novel_name, file_path, stats["success"], stats["failed"])
+        if stats["failed"]:
+            logger.warning("⚠ 有 %d 章下载失败，重新运行即可只重试这些章节", stats["failed"])
         return file_path
 
+    # 增量更新连载中的小说
+    # 只抓目录页并与章节清单比对：新增章节追加到输出文件末尾；标题变化或上次失败的章节重新抓取，
+    # 正文确有变化（或新章节不在末尾）时按日志重建输出文件，已下载的章节不再联网
+    async def update_novel(self, novel_name: str, author: str, index_url: str,
+                           concurrency: int = ChapterDownloadEngine.DEFAULT_CONCURRENCY,
+                           window: int = None,
+                           fsync_interval: int = StreamingNovelWriter.DEFAULT_FSYNC_INTERVAL,
+                           gate=None, chapters: list[dict] = None, storage: str = "txt"):
+        file_path, journal_path, manifest_path = self._book_paths(novel_name, author, storage)
+        if chapters is None:
+            chapters = await self.fetch_chapter_list(index_url)
+        if not chapters:
+            logger.warning("[⚠] 目录为空，无法更新《%s》: %s", novel_name, index_url)
+            return file_path
+
+        manifest = ChapterManifest(manifest_path)
+        if not manifest.load() or not os.path.exists(file_path):
+            logger.info("未找到《%s》的下载记录，转为完整下载", novel_name)
+            return await self.download_novel(novel_name, author, chapters, concurrency, window, fsync_interval, gate,
+                                             storage)
+
+        new, stale = manifest.diff(chapters)
+        if not new and not stale:
+            logger.info("📗 《%s》已是最新（共 %d 章）", novel_name, len(chapters))
+            return file_path
+        logger.info("🔄 《%s》新增 %d 章，待复查 %d 章", novel_name, len(new), len(stale))
+
+        journal = ChapterJournal(journal_path)
+        journal.load()
+        hashes = {entry["url"]: entry.get("hash") for entry in manifest.chapters}
+
+        # 复查章节：重新抓取，目录标题变化或正文哈希变化才算真正变更
+        retitled = {ch["url"] for ch in stale if manifest.get(ch["url"])["title"] != ch["title"]}
+        changed = set()
+
+        async def refetch(url):
+            data = await self.fetch_chapter_content(url)
+            if data and data.get("content"):
+                digest = ChapterManifest.content_hash(data["content"])
+                if digest != hashes.get(url) or url in retitled:
+                    await journal.record(url, data)
+                    hashes[url] = digest
+                    changed.add(url)
+            return data
+
+        async def discard(idx, chap, text):
+            pass
+
+        if stale:
+            await ChapterDownloadEngine(refetch, concurrency=concurrency, window=window, gate=gate).run(stale, discard)
+
+        if not manifest.is_prefix_of(chapters) or (changed and storage != "store"):
+            logger.info("📝 %d 章内容有变化，按下载日志重建输出文件", len(changed))
+            return await self.download_novel(novel_name, author, chapters, concurrency, window, fsync_interval, gate,
+                                             storage)
+        if changed:
+            # 章节库按序号覆盖变化的章节即可，其余章节不动
+            positions = {ch["url"]: i for i, ch in enumerate(chapters)}
+            async with ChapterStore(file_path) as store:
+                for url in changed:
+                    idx = positions[url]
+                    text = ChapterDownloadEngine.render_chapter(idx, chapters[idx], await journal.get(url))
+                    await store.put_async(idx, text)
+            logger.info("📝 %d 章内容有变化，已在章节库中原位更新", len(changed))
+
+        if new:
+            # 新章节全部在末尾：只下载这些章节并追加
+            engine = ChapterDownloadEngine(self._journal_fetcher(journal, hashes), concurrency=concurrency,
+                                           window=window, gate=gate)
+            writer = self._open_writer(storage, file_path, fsync_interval)
+            start = len(manifest)
+
+            async def append_chapter(idx, chap, text):
+                await writer.write(idx - start, text)
+
+            await writer.open(append=True)
+            async with writer:
+                stats = await engine.run(new, append_chapter, start=start)
+            logger.info("✅ 《%s》追加 %d 章，失败 %d 章：%s", novel_name, stats["success"], stats["failed"], file_path)
+
+        manifest.save(chapters, hashes)
+        return file_path
+
+    # 把章节库（storage="store" 的输出）导出为 TXT 或 EPUB，在工作线程中逐章读写，不阻塞事件循环
+    async def export_novel(self, novel_name: str, author: str, fmt: str = "epub", path: str = None):
+        store_path = self._book_paths(novel_name, author, "store")[0]
+        if not os.path.exists(store_path):
+            raise FileNotFoundError(f"未找到章节库: {store_path}")
+        if fmt not in ("txt", "epub"):
+            raise ValueError(f"不支持的导出格式: {fmt}（可选 txt、epub）")
+        path = path or f"{os.path.splitext(store_path)[0]}.{fmt}"
+
+        def export():
+            with ChapterStore(store_path) as store:
+                if fmt == "epub":
+                    return store.export_epub(path, novel_name, author)
+                return store.export_txt(path)
+
+        path = await asyncio.to_thread(export)
+        logger.info("📦 《%s》已导出：%s", novel_name, path)
+        return path
+
 
 
     def compress_html(self, html_content):
         """
-        使用正则表达式压缩HTML，移除重复的链接
+        压缩HTML，移除同一容器内重复的链接（按 href 计数，保留第一个，其余替换为链接文字），返回完整文档
         """
-        # 匹配所有容器
-        container_pattern = r'(<div[^>]*>.*?</div>|<ul[^>]*>.*?</ul>|<ol[^>]*>.*?</ol>|<nav[^>]*>.*?</nav>|<section[^>]*>.*?</section>|<article[^>]*>.*?</article>)'
-        
-        def remove_duplicate_links(match):
-            container_html = match.group(0)
-            
-            # 匹配容器内的所有链接
-            link_pattern = r'(<a\s+[^>]*href=([\'"])(.*?)\2[^>]*>.*?</a>)'
-            links = re.findall(link_pattern, container_html, re.DOTALL)
-            
-            # 记录每个href出现的次数和第一个出现的位置
-            href_count = defaultdict(int)
-            href_first_occurrence = {}
-            
-            for i, (full_match, quote, href) in enumerate(links):
-                href_count[href] += 1
-                if href not in href_first_occurrence:
-                    href_first_occurrence[href] = (full_match, i)
-            
-            # 构建新的容器内容
-            new_container = container_html
-            
-            # 从后往前处理，避免索引变化问题
-            for href, count in sorted(href_count.items(), key=lambda x: -x[1]):
-                if count > 1:
-                    # 找到所有重复链接的位置
-                    all_occurrences = [m.start() for m in re.finditer(re.escape(href_first_occurrence[href][0]), new_container)]
-                    
-                    # 保留第一个，移除其他
-                    for i, pos in enumerate(all_occurrences):
-                        if i > 0:  # 跳过第一个
-                            # 找到链接的完整匹配
-                            link_match = re.search(r'<a\s+[^>]*>.*?</a>', new_container[pos:], re.DOTALL)
-                            if link_match:
-                                link_text_match = re.search(r'>([^<]*)</a>', link_match.group(0))
-                                if link_text_match:
-                                    # 保留链接文本，但移除链接
-                                    link_text = link_text_match.group(1)
-                                    new_container = new_container[:pos] + link_text + new_container[pos+len(link_match.group(0)):]
-            
-            return new_container
-        
-        # 对每个容器应用去重
-        compressed_html = re.sub(container_pattern, remove_duplicate_links, html_content, flags=re.DOTALL)
-        
-        return compressed_html
+        return compress_links(html_content)
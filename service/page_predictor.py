@@ -0,0 +1,130 @@
+# service/page_predictor.py
+import posixpath
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urlunparse
+
+from service.telemetry import get_logger
+
+logger = get_logger("prefetch")
+
+# 子页文件名：<章节文件名><分隔符><页码><扩展名>，如 123_2.html、123-2.html
+_SUBPAGE_RE = r"^{stem}(?P<sep>[_-]?)(?P<num>\d+){ext}$"
+
+
+class PaginationPredictor:
+    """
+    章节内分页 URL 预测器（按站点学习）
+    - 从“第 1 页 -> 第 2 页”的真实链接学习分页 URL 规律，如 123.html -> 123_2.html
+    - 按规律预测后续子页 URL，供并行预取；预测与真实链接不符时累计失误，过多则停用该站点的预测
+    - 按站点统计“有第 k 页的章节占比”，只预取大概率存在的子页，且不超过见过的最大页数；
+      偶尔出现的多页章节不会让每章都多发一个必然 404 的请求
+    """
+    MAX_DEPTH = 4
+    DEFAULT_DEPTH = 1           # 还没有完整章节样本时只预取下一页
+    SPECULATE_THRESHOLD = 0.5   # 已到第 n 页的章节中，超过这个比例有第 n+k 页才预取
+    MAX_MISSES = 3
+
+    _instance: Optional["PaginationPredictor"] = None
+
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.max_depth = max_depth
+        # host -> {"sep": str, "first": int, "misses": int, "disabled": bool}
+        self._patterns: Dict[str, Dict] = {}
+        # host -> reached，reached[k] 为页数 >= k+1 的章节数（reached[0] 即章节总数）
+        self._history: Dict[str, List[int]] = {}
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "PaginationPredictor":
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @staticmethod
+    def _split(url: str):
+        parts = urlparse(url)
+        dirname, filename = posixpath.split(parts.path)
+        stem, ext = posixpath.splitext(filename)
+        return parts, dirname, stem, ext
+
+    def learn(self, chapter_url: str, next_url: str) -> bool:
+        """用章节首页与其真实下一页链接学习规律，返回是否识别出规律"""
+        host = urlparse(chapter_url).hostname or ""
+        pattern = self._patterns.get(host)
+        if pattern and (pattern["disabled"] or pattern["misses"] == 0):
+            return not pattern["disabled"]
+
+        parts, dirname, stem, ext = self._split(chapter_url)
+        next_parts, next_dir, next_stem, next_ext = self._split(next_url)
+        if not stem or next_dir != dirname or next_parts.netloc != parts.netloc:
+            return False
+        match = re.match(_SUBPAGE_RE.format(stem=re.escape(stem), ext=re.escape(ext)), next_stem + next_ext)
+        if not match:
+            return False
+
+        self._patterns[host] = {
+            "sep": match.group("sep"),
+            "first": int(match.group("num")),
+            "misses": pattern["misses"] if pattern else 0,
+            "disabled": False,
+        }
+        return True
+
+    def predict(self, chapter_url: str, page_no: int) -> Optional[str]:
+        """预测章节第 page_no 页（从 1 开始，首页即章节 URL）的地址，无规律时返回 None"""
+        if page_no < 2:
+            return chapter_url
+        host = urlparse(chapter_url).hostname or ""
+        pattern = self._patterns.get(host)
+        if not pattern or pattern["disabled"]:
+            return None
+        parts, dirname, stem, ext = self._split(chapter_url)
+        if not stem:
+            return None
+        number = pattern["first"] + page_no - 2
+        path = posixpath.join(dirname, f"{stem}{pattern['sep']}{number}{ext}")
+        return urlunparse(parts._replace(path=path, query="", fragment=""))
+
+    def record_miss(self, chapter_url: str):
+        """预测与真实下一页不符"""
+        host = urlparse(chapter_url).hostname or ""
+        pattern = self._patterns.get(host)
+        if not pattern:
+            return
+        pattern["misses"] += 1
+        if pattern["misses"] >= self.MAX_MISSES:
+            pattern["disabled"] = True
+            logger.info("[Prefetch] %s 分页预测多次失误，已停用预取", host)
+
+    def record_chapter(self, chapter_url: str, pages: int):
+        """记录一章实际的页数，用于估算预取深度"""
+        host = urlparse(chapter_url).hostname or ""
+        reached = self._history.setdefault(host, [])
+        pages = max(1, pages)
+        if len(reached) < pages:
+            reached.extend([0] * (pages - len(reached)))
+        for k in range(pages):
+            reached[k] += 1
+
+    def depth(self, chapter_url: str, page_no: int = 1) -> int:
+        """
+        已确认第 page_no 页存在时，往后预取几页
+        第 page_no + k 页在样本中出现的条件概率（有该页的章节数 / 已到第 page_no 页的章节数）
+        超过 SPECULATE_THRESHOLD 才预取，超出见过的最大页数的页不预取
+        """
+        host = urlparse(chapter_url).hostname or ""
+        pattern = self._patterns.get(host)
+        if not pattern or pattern["disabled"]:
+            return 0
+        reached = self._history.get(host)
+        if not reached:
+            return self.DEFAULT_DEPTH
+        if page_no > len(reached):
+            return 0
+        base = reached[page_no - 1]
+        depth = 0
+        while depth < self.max_depth and page_no + depth < len(reached):
+            if reached[page_no + depth] / base <= self.SPECULATE_THRESHOLD:
+                break
+            depth += 1
+        return depth
@@ -0,0 +1,110 @@
+# service/parse_pool.py
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from service.extraction_plan import ExtractionPlan
+from service.telemetry import Metrics
+
+
+# ---------- 工作函数（模块级，进程池可直接 pickle） ----------
+# 入参只有原始字节、编码与抽取计划，返回纯 dict / list，不跨线程或进程传递 lxml 对象；
+# 抽取计划由调用方编译一次，工作线程 / 进程内按计划的缓存键取本地副本，只编译一次
+
+def extract_content_page(content: bytes, encoding: str, plan: ExtractionPlan) -> Optional[Dict[str, Any]]:
+    """解析正文页，返回 {"title", "paragraphs", "next_page"}，空文档返回 None"""
+    root = ExtractionPlan.parse(content, encoding)
+    if root is None:
+        return None
+    return plan.local().extract_content(root)
+
+
+def extract_chapter_page(content: bytes, encoding: str, plan: ExtractionPlan,
+                         page_url: str = "") -> Optional[Dict[str, Any]]:
+    """解析目录页，返回 {"chapters", "index_pages"}，空文档返回 None"""
+    root = ExtractionPlan.parse(content, encoding)
+    if root is None:
+        return None
+    plan = plan.local()
+    return {
+        "chapters": plan.extract_chapters(root, page_url),
+        "index_pages": plan.extract_index_pages(root, page_url),
+    }
+
+
+def timed_call(func, *args):
+    """在工作线程 / 进程内计时，返回 (结果, 耗时秒)，排队等待不计入解析耗时"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class ParsePool:
+    """
+    解析工作池
+    - 把 lxml 解析与 XPath 抽取从事件循环移到线程池或进程池，CPU 密集的解析不再阻塞网络 I/O
+    - mode="thread"：lxml 解析期间释放 GIL，开销小；mode="process"：多核完全并行，每页多一次字节序列化；
+      mode="inline"：在事件循环中直接执行（单核或调试时使用）
+    - 默认模式与工作数可由环境变量 PARSE_POOL_MODE / PARSE_POOL_WORKERS 指定
+    - 每次解析的耗时按工作函数名记入 Metrics（parse_seconds）
+    """
+    MODES = ("thread", "process", "inline")
+    DEFAULT_MODE = "thread"
+
+    _instance: Optional["ParsePool"] = None
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        mode = (mode or os.getenv("PARSE_POOL_MODE") or self.DEFAULT_MODE).lower()
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的解析池模式: {mode}（可选 {', '.join(self.MODES)}）")
+        self.mode = mode
+        self.max_workers = max_workers or int(os.getenv("PARSE_POOL_WORKERS", 0)) or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        self.metrics = metrics or Metrics.get_instance()
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "ParsePool":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @classmethod
+    def close_instance(cls):
+        if cls._instance is not None:
+            cls._instance.close()
+            cls._instance = None
+
+    def _ensure_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parse")
+        return self._executor
+
+    async def run(self, func, *args):
+        """在工作池中执行 func(*args)"""
+        executor = self._ensure_executor()
+        if executor is None:
+            result, elapsed = timed_call(func, *args)
+        else:
+            result, elapsed = await asyncio.get_running_loop().run_in_executor(executor, timed_call, func, *args)
+        self.metrics.observe("parse_seconds", elapsed, func=func.__name__)
+        return result
+
+    async def extract_content(self, content: bytes, encoding: str, plan: ExtractionPlan):
+        return await self.run(extract_content_page, content, encoding, plan)
+
+    async def extract_chapters(self, content: bytes, encoding: str, plan: ExtractionPlan, page_url: str = ""):
+        return await self.run(extract_chapter_page, content, encoding, plan, page_url)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,204 @@
+# service/rate_limiter.py
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from service.transport import TransportError
+
+
+class HostRateLimiter:
+    """
+    单个 host 的限速器
+    - 令牌桶：速率由 SiteConfig.delay 推出（每 delay 秒一个令牌）
+    - AIMD 并发：连续成功时并发 +1、速率小幅上调；遇到 429/503/超时并发减半、速率减半
+    - pause()：服务端给出 Retry-After 时，该 host 的所有新请求都等到指定时间之后再发
+    """
+    RATE_CEILING = 4.0        # 速率最多上调到初始值的倍数
+    RATE_FLOOR = 0.1          # 速率最少下调到初始值的倍数
+    DECREASE_FACTOR = 0.5
+
+    def __init__(self, host: str, delay: float = 0.0, initial_concurrency: int = 4,
+                 min_concurrency: int = 1, max_concurrency: int = 16):
+        self.host = host
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "timeouts": 0}
+        self._success_streak = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.set_delay(delay)
+
+    def _ensure_loop(self):
+        # 同步原语与事件循环绑定，进程内多次 asyncio.run 时需要重建
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self._bucket_lock = asyncio.Lock()
+            self.in_flight = 0
+
+    def set_delay(self, delay: float):
+        """重新设定基础延时，delay <= 0 表示不限速，只做并发控制"""
+        self.delay = delay
+        self.base_rate = 1.0 / delay if delay and delay > 0 else None
+        self.rate = self.base_rate
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+
+    def pause(self, seconds: float):
+        """暂停该 host 的新请求 seconds 秒（多次调用取最晚的时间）"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        self._ensure_loop()
+        # 暂停期间不占并发槽，醒来后再排队
+        while (wait := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.concurrency))
+            self.in_flight += 1
+        try:
+            await self._take_token()
+        except BaseException:
+            await self._release_slot()
+            raise
+        self.stats["requests"] += 1
+
+    async def _take_token(self):
+        if not self.rate:
+            return
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    async def release(self, outcome: str = "ok"):
+        """
+        归还并发槽并根据结果调整速率
+
+        Args:
+            outcome: "ok" / "throttled"（429、503）/ "timeout" / "error"（其他错误，不调整）
+        """
+        if outcome == "ok":
+            self._on_success()
+        elif outcome in ("throttled", "timeout"):
+            self.stats["throttled" if outcome == "throttled" else "timeouts"] += 1
+            self._on_congestion()
+        await self._release_slot()
+
+    async def _release_slot(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self):
+        # 加性增：每成功“当前并发数”次，并发 +1，速率上调 10% 的基础速率
+        self._success_streak += 1
+        if self._success_streak < int(self.concurrency):
+            return
+        self._success_streak = 0
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+        if self.base_rate:
+            self.rate = min(self.base_rate * self.RATE_CEILING, self.rate + self.base_rate * 0.1)
+
+    def _on_congestion(self):
+        # 乘性减
+        self._success_streak = 0
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.DECREASE_FACTOR)
+        if self.base_rate:
+            self.rate = max(self.base_rate * self.RATE_FLOOR, self.rate * self.DECREASE_FACTOR)
+
+    def snapshot(self) -> Dict:
+        return {
+            "delay": self.delay,
+            "rate": round(self.rate, 4) if self.rate else None,
+            "concurrency": int(self.concurrency),
+            "in_flight": self.in_flight,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            **self.stats,
+        }
+
+
+class RateLimiter:
+    """
+    按域名分配 HostRateLimiter 的进程级限速器
+    使用方式：
+        async with rate_limiter.limit(url):
+            ...发起请求...
+    退出时根据异常自动判断结果：429/503 视为限流，超时视为拥塞
+    """
+    THROTTLE_STATUS = (429, 503)
+
+    _instance: Optional["RateLimiter"] = None
+
+    def __init__(self, default_delay: float = 0.0, **host_kwargs):
+        self.default_delay = default_delay
+        self.host_kwargs = host_kwargs
+        self._hosts: Dict[str, HostRateLimiter] = {}
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "RateLimiter":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def configure(self, host: str, delay: float):
+        """用站点配置的 delay 初始化（或重设）某个 host 的限速"""
+        host = host.lower()
+        if host in self._hosts:
+            if self._hosts[host].delay != delay:
+                self._hosts[host].set_delay(delay)
+        else:
+            self._hosts[host] = HostRateLimiter(host, delay, **self.host_kwargs)
+
+    def get(self, host: str) -> HostRateLimiter:
+        host = host.lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostRateLimiter(host, self.default_delay, **self.host_kwargs)
+        return self._hosts[host]
+
+    def limit(self, url: str) -> "_LimitContext":
+        return _LimitContext(self.get(self.host_of(url)))
+
+    def get_rates(self) -> Dict[str, Dict]:
+        """各域名当前的速率、并发上限与限流统计"""
+        return {host: limiter.snapshot() for host, limiter in self._hosts.items()}
+
+    @classmethod
+    def classify(cls, exc: Optional[BaseException], status: Optional[int] = None) -> str:
+        if isinstance(exc, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(exc, TransportError) and exc.status is not None:
+            status = exc.status
+        if status in cls.THROTTLE_STATUS:
+            return "throttled"
+        if exc is not None or (status is not None and status >= 400):
+            return "error"
+        return "ok"
+
+
+class _LimitContext:
+    def __init__(self, limiter: HostRateLimiter):
+        self.limiter = limiter
+        self.status: Optional[int] = None   # 调用方可写入响应状态码，供未抛异常时判断
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.limiter.release(RateLimiter.classify(exc_val, self.status))
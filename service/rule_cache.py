@@ -0,0 +1,212 @@
+# service/rule_cache.py
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from service.extraction_plan import ExtractionPlan
+from service.html_cleaner import HtmlCleaner
+from service.telemetry import get_logger
+
+logger = get_logger("rules")
+
+_DIGITS_RE = re.compile(r"\d+")
+FINGERPRINT_BITS = 64
+
+
+def dom_features(html_content: str, depth: int = 3) -> Counter:
+    """
+    页面结构特征：每个元素取自身及上面 depth-1 层祖先的 “标签.class#id” 路径，统计出现次数
+    （忽略文本；class / id 中的数字去掉，避免 chapter_123 之类的编号让同模板页面变得不同）
+    """
+    body = HtmlCleaner.parse_body(html_content)
+    features: Counter = Counter()
+    if body is None:
+        return features
+
+    labels: Dict[Any, str] = {}
+    for el in body.iter():
+        if not isinstance(el.tag, str):
+            continue
+        label = el.tag
+        cls = el.get("class")
+        if cls:
+            label += "." + ".".join(sorted(_DIGITS_RE.sub("", cls).split()))
+        el_id = el.get("id")
+        if el_id:
+            label += "#" + _DIGITS_RE.sub("", el_id)
+        labels[el] = label
+
+        path = [label]
+        parent = el.getparent()
+        while parent is not None and len(path) < depth and parent in labels:
+            path.append(labels[parent])
+            parent = parent.getparent()
+        features["/".join(reversed(path))] += 1
+    return features
+
+
+def simhash(features: Counter) -> int:
+    """64 位 simhash，权重取 1 + log2(次数)，上千条章节列表不会压过其余结构"""
+    weights = [0.0] * FINGERPRINT_BITS
+    for feature, count in features.items():
+        digest = int.from_bytes(hashlib.md5(feature.encode("utf-8")).digest()[:8], "big")
+        weight = 1 + math.log2(count)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += weight if digest >> bit & 1 else -weight
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def dom_fingerprint(html_content: str) -> int:
+    return simhash(dom_features(html_content))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class RuleCache:
+    """
+    按页面结构指纹缓存 Agent 生成的 XPath 规则
+    - 目录页、正文页各算一个 simhash 指纹，与已缓存条目的海明距离都不超过 max_distance 视为同一套站点模板
+    - 命中后先用本次抓到的样例页试跑规则（目录能抽出章节、正文有足够文字、能取到书名），通过才复用，不再调用 LLM
+    - 只缓存能在自身样例页上通过校验的规则；所有条目存放在一个 JSON 文件里，写入时先写临时文件再 rename
+    """
+    DEFAULT_PATH = "./cache/xpath_rules.json"
+    DEFAULT_MAX_DISTANCE = 8
+    MIN_CHAPTERS = 3
+    MIN_CONTENT_CHARS = 100
+    SECTIONS = ("novel", "chapters", "content")
+
+    _instance: Optional["RuleCache"] = None
+
+    def __init__(self, path: str = DEFAULT_PATH, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.entries: List[Dict[str, Any]] = []
+        self.load()
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "RuleCache":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    # ---------- 存取 ----------
+
+    def load(self) -> int:
+        self.entries = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", [])
+            except (OSError, ValueError) as e:
+                logger.warning("[RuleCache] 规则缓存读取失败，按空缓存处理 %s: %s", self.path, e)
+        return len(self.entries)
+
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": time.time(), "entries": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    # ---------- 校验 ----------
+
+    def verify(self, rules: Dict[str, Any], chapter_html: str, content_html: str,
+               novel_html: Optional[str] = None) -> List[str]:
+        """
+        在样例页上试跑规则
+
+        Returns:
+            List[str]: 未通过的原因，空列表表示通过
+        """
+        try:
+            plan = ExtractionPlan.for_config(rules)
+        except ValueError as e:
+            return [str(e)]
+
+        problems = []
+        novel_root = ExtractionPlan.parse((novel_html or chapter_html).encode("utf-8"))
+        if novel_root is None or not plan.extract_novel_info(novel_root)["title"]:
+            problems.append("小说信息规则取不到书名")
+
+        chapter_root = ExtractionPlan.parse(chapter_html.encode("utf-8"))
+        chapters = plan.extract_chapters(chapter_root) if chapter_root is not None else []
+        if len(chapters) < self.MIN_CHAPTERS:
+            problems.append(f"目录规则只抽出 {len(chapters)} 章")
+
+        content_root = ExtractionPlan.parse(content_html.encode("utf-8"))
+        text_len = 0
+        if content_root is not None:
+            text_len = sum(len(p) for p in plan.extract_content(content_root)["paragraphs"])
+        if text_len < self.MIN_CONTENT_CHARS:
+            problems.append(f"正文规则只抽出 {text_len} 字")
+        return problems
+
+    # ---------- 查询与写入 ----------
+
+    def _candidates(self, chapter_fp: int, content_fp: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """两种页面的指纹都在阈值内的条目，按总距离从近到远排序"""
+        matches = []
+        for entry in self.entries:
+            d_chapter = hamming(chapter_fp, int(entry["chapter_fp"], 16))
+            d_content = hamming(content_fp, int(entry["content_fp"], 16))
+            if d_chapter <= self.max_distance and d_content <= self.max_distance:
+                matches.append((d_chapter + d_content, entry))
+        matches.sort(key=lambda m: m[0])
+        return matches
+
+    def lookup(self, chapter_html: str, content_html: str,
+               novel_html: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找结构相近且能在样例页上通过校验的缓存规则
+
+        Returns:
+            {"novel": ..., "chapters": ..., "content": ...}，没有可用规则时返回 None
+        """
+        chapter_fp, content_fp = dom_fingerprint(chapter_html), dom_fingerprint(content_html)
+        for distance, entry in self._candidates(chapter_fp, content_fp):
+            problems = self.verify(entry["rules"], chapter_html, content_html, novel_html)
+            if problems:
+                logger.warning("[RuleCache] 模板 %s 结构相近（距离 %d）但校验未通过: %s",
+                               entry["site"], distance, "；".join(problems))
+                continue
+            entry["hits"] = entry.get("hits", 0) + 1
+            self.save()
+            logger.info("[RuleCache] 复用 %s 的规则（指纹距离 %d）", entry["site"], distance)
+            return entry["rules"]
+        return None
+
+    def store(self, site: str, rules: Dict[str, Any], chapter_html: str, content_html: str,
+              novel_html: Optional[str] = None) -> bool:
+        """
+        校验通过后按样例页指纹缓存规则；同一站点的旧条目被替换
+
+        Returns:
+            bool: 是否写入了缓存
+        """
+        rules = {name: rules[name] for name in self.SECTIONS}
+        problems = self.verify(rules, chapter_html, content_html, novel_html)
+        if problems:
+            logger.warning("[RuleCache] %s 的规则未通过样例页校验，不缓存: %s", site, "；".join(problems))
+            return False
+
+        self.entries = [entry for entry in self.entries if entry["site"] != site]
+        self.entries.append({
+            "site": site,
+            "chapter_fp": f"{dom_fingerprint(chapter_html):016x}",
+            "content_fp": f"{dom_fingerprint(content_html):016x}",
+            "rules": rules,
+            "created_at": time.time(),
+            "hits": 0,
+        })
+        self.save()
+        return True
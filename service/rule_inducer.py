@@ -0,0 +1,263 @@
+# service/rule_inducer.py
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from service.extraction_plan import ExtractionPlan
+from service.html_cleaner import HtmlCleaner
+
+_CHAPTER_TITLE_RE = re.compile(
+    r"^\s*(第\s*[0-9零〇一二两三四五六七八九十百千万]+\s*[章节回卷集部篇]|chapter\s*\d+|\d+[\s.、：:])",
+    re.IGNORECASE,
+)
+_NEXT_PAGE_RE = re.compile(r"^\s*(下一页|下页|next\s*page)\s*[>»→]*\s*$", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def _text_len(text: Optional[str]) -> int:
+    return len(_SPACES_RE.sub("", text)) if text else 0
+
+
+class RuleInducer:
+    """
+    不调用 LLM 的启发式规则推断（目录页、正文页）
+    - 目录：同一父节点下重复出现、各含一个链接的兄弟节点中，数量最多、标题最像章节名的一组即章节列表
+    - 正文：直接文本（自身文本、子节点 tail 与直接子 <p> 的文字）最多、链接文字占比最低的块即正文容器
+    - XPath 以最近的带 id / class 的祖先为锚点，不使用位置下标；生成后在同一页面上用 ExtractionPlan 回放核对
+    - 每条规则附带 0~1 的置信度，编排器只对低于阈值的部分调用 Agent
+    """
+    MIN_ITEMS = 5
+    MIN_CONTENT_CHARS = 200
+    HEADING_TAGS = ("h1", "h2", "h3")
+
+    # ---------- 对外接口 ----------
+
+    def induce_chapters(self, html_content: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        推断章节目录规则
+
+        Returns:
+            (ChapterListConfig 字段字典, 置信度)；找不到候选时为 (None, 0.0)
+        """
+        body = HtmlCleaner.parse_body(html_content)
+        if body is None:
+            return None, 0.0
+        best = self._best_list(body)
+        if best is None:
+            return None, 0.0
+        container, item_tag, links, total_links = best
+
+        direct = all(link.getparent().tag == item_tag for link in links) if item_tag != "a" else True
+        if item_tag == "a":
+            item, title, url = "./a", "./text()", "./@href"
+        elif direct:
+            item, title, url = f"./{item_tag}", "./a//text()", "./a/@href"
+        else:
+            item, title, url = f"./{item_tag}", ".//a//text()", ".//a/@href"
+        rules = {
+            "container": self._locate(container),
+            "item": item,
+            "title": title,
+            "url": url,
+            "pagination": False,
+            "more_url": None,
+        }
+
+        # 在同一页面上回放，抽出的章节数必须与统计时一致
+        extracted = self._replay(html_content, {"chapters": rules}, "chapters")
+        if extracted != len(links):
+            return rules, 0.0
+
+        titles = ["".join(link.itertext()).strip() for link in links]
+        chapter_like = sum(1 for t in titles if _CHAPTER_TITLE_RE.match(t)) / len(titles)
+        size = min(1.0, len(links) / 20)
+        share = len(links) / max(total_links, 1)
+        confidence = 0.5 * chapter_like + 0.2 * size + 0.3 * min(1.0, share * 1.5)
+        if not self._anchored(container):
+            confidence *= 0.8
+        return rules, round(confidence, 3)
+
+    def induce_content(self, html_content: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        推断正文规则
+
+        Returns:
+            (ContentPageConfig 字段字典, 置信度)；找不到候选时为 (None, 0.0)
+        """
+        body = HtmlCleaner.parse_body(html_content)
+        if body is None:
+            return None, 0.0
+        best = self._best_block(body)
+        if best is None:
+            return None, 0.0
+        block, direct_len, from_p, link_len, total_len = best
+
+        container = self._locate(block)
+        heading = self._heading(body, block)
+        next_link = self._next_page(body)
+        rules = {
+            "container": container,
+            "title": f"{self._locate(heading)}/text()" if heading is not None else "",
+            "text": "./p//text()" if from_p else "./text()",
+            "next_page": self._next_page_xpath(next_link) if next_link is not None else None,
+            "pagination": next_link is not None,
+        }
+
+        extracted = self._replay(html_content, {"content": rules}, "content")
+        if extracted < direct_len * 0.9:
+            return rules, 0.0
+
+        size = min(1.0, direct_len / 1000)
+        purity = 1 - link_len / max(direct_len + link_len, 1)
+        dominance = direct_len / max(total_len, 1)
+        confidence = 0.3 * size + 0.3 * purity + 0.4 * min(1.0, dominance * 1.5)
+        if heading is None:
+            confidence *= 0.8
+        if not self._anchored(block):
+            confidence *= 0.8
+        return rules, round(confidence, 3)
+
+    # ---------- 目录 ----------
+
+    def _best_list(self, body):
+        """
+        (容器, 条目标签, 各条目的链接, 全页链接数)；条目为容器的直接子节点，
+        自身是 <a> 或只含一个 <a>，按 数量 ×（0.5 + 章节名占比）选最优
+        """
+        groups: Dict[Tuple[Any, str], List] = defaultdict(list)
+        total_links = 0
+        for el in body.iter("a"):
+            if el.get("href") is None:
+                continue
+            total_links += 1
+            # 向上最多两层找条目：<a> 本身、<dd><a>、<li><span><a>
+            node = el
+            for _ in range(3):
+                parent = node.getparent()
+                if parent is None or parent is body:
+                    break
+                if node is el or len(node.findall(".//a")) == 1:
+                    groups[(parent, node.tag)].append(el)
+                node = parent
+
+        best, best_score = None, 0.0
+        for (parent, tag), links in groups.items():
+            if len(links) < self.MIN_ITEMS:
+                continue
+            titles = ["".join(link.itertext()).strip() for link in links]
+            chapter_like = sum(1 for t in titles if _CHAPTER_TITLE_RE.match(t)) / len(titles)
+            score = len(links) * (0.5 + chapter_like)
+            if score > best_score:
+                best, best_score = (parent, tag, links, total_links), score
+        return best
+
+    # ---------- 正文 ----------
+
+    def _best_block(self, body):
+        """(块, 直接文本长度, 是否以 <p> 为主, 块内链接文字长度, 全页文本长度)"""
+        total_len = _text_len("".join(body.itertext()))
+        best, best_score = None, 0.0
+        for el in body.iter():
+            if not isinstance(el.tag, str) or el.tag in ("a", "p"):
+                continue
+            own = _text_len(el.text)
+            p_len = 0
+            for child in el:
+                own += _text_len(child.tail)
+                if child.tag == "p":
+                    p_len += _text_len("".join(child.itertext()))
+            direct_len = own + p_len
+            if direct_len < self.MIN_CONTENT_CHARS:
+                continue
+            link_len = sum(_text_len("".join(a.itertext())) for a in el.iter("a"))
+            score = direct_len * (1 - link_len / max(direct_len + link_len, 1))
+            if score > best_score:
+                best, best_score = (el, direct_len, p_len > own, link_len, total_len), score
+        return best
+
+    def _heading(self, body, block):
+        """正文标题：文档顺序上位于块之前（或块内）最近的 h1~h3"""
+        order = {el: i for i, el in enumerate(body.iter())}
+        for tag in self.HEADING_TAGS:
+            candidates = [h for h in body.iter(tag) if _text_len("".join(h.itertext()))]
+            if not candidates:
+                continue
+            before = [h for h in candidates if order[h] < order[block] or block in h.iterancestors()]
+            return before[-1] if before else candidates[0]
+        return None
+
+    @staticmethod
+    def _next_page(body):
+        for a in body.iter("a"):
+            if a.get("href") and a.text and _NEXT_PAGE_RE.match(a.text):
+                return a
+        return None
+
+    @staticmethod
+    def _next_page_xpath(link) -> str:
+        """翻页链接有 id 时按 id 定位，否则按链接文字（位置往往不固定，且页面上下各有一个）"""
+        link_id = link.get("id")
+        if link_id and not _DIGITS_RE.search(link_id):
+            return f"//a[@id='{link_id}']/@href"
+        return f"//a[normalize-space(text())='{link.text.strip()}']/@href"
+
+    # ---------- XPath 定位 ----------
+
+    @staticmethod
+    def _anchor(el) -> Optional[str]:
+        """元素自身可用作锚点的谓词（不含数字的 id 优先，其次 class），没有则返回 None"""
+        el_id = el.get("id")
+        if el_id and not _DIGITS_RE.search(el_id):
+            return f"[@id='{el_id}']"
+        cls = el.get("class")
+        if cls and not _DIGITS_RE.search(cls) and "'" not in cls:
+            return f"[@class='{cls}']"
+        return None
+
+    def _anchored(self, el) -> bool:
+        node = el
+        while node is not None and node.tag != "body":
+            if self._anchor(node):
+                return True
+            node = node.getparent()
+        return False
+
+    def _locate(self, el) -> str:
+        """
+        元素的 XPath：自身有锚点且全页唯一时直接用 //tag[@...]，
+        否则从最近的唯一锚点祖先往下按标签拼接；一直到 body 都没有锚点时从 //body 开始
+        """
+        root = el.getroottree()
+        steps: List[str] = []
+        node = el
+        while node is not None and node.tag != "body":
+            anchor = self._anchor(node)
+            if anchor:
+                path = f"//{node.tag}{anchor}" + "".join(f"/{s}" for s in reversed(steps))
+                try:
+                    if len(root.xpath(path)) == 1:
+                        return path
+                except etree.XPathError:
+                    pass
+            steps.append(node.tag)
+            node = node.getparent()
+        return "//body" + "".join(f"/{s}" for s in reversed(steps))
+
+    # ---------- 回放 ----------
+
+    @staticmethod
+    def _replay(html_content: str, config: Dict[str, Any], section: str) -> int:
+        """用生成的规则在原页面上抽取：目录返回章节数，正文返回去空白后的字数"""
+        try:
+            plan = ExtractionPlan(config)
+        except ValueError:
+            return 0
+        root = ExtractionPlan.parse(html_content.encode("utf-8"))
+        if root is None:
+            return 0
+        if section == "chapters":
+            return len(plan.extract_chapters(root))
+        return sum(_text_len(p) for p in plan.extract_content(root)["paragraphs"])
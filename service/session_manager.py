@@ -0,0 +1,146 @@
+# service/session_manager.py
+import asyncio
+from typing import Dict, Optional, Tuple
+import aiohttp
+
+try:
+    import httpx  # 可选依赖，仅 httpx 传输层使用
+except ImportError:
+    httpx = None
+
+
+class SessionManager:
+    """
+    进程级 HTTP 会话管理器
+    - 整个进程共用一个 aiohttp.ClientSession，避免每页重新握手
+    - 按 host 维护 keep-alive 连接池，带 DNS 缓存
+    - 通过 TraceConfig 统计连接复用情况
+    - 同时管理 httpx 传输层的 AsyncClient（按代理与是否启用 HTTP/2 区分），统计 HTTP/2 响应数
+    """
+    DEFAULT_LIMIT = 100
+    DEFAULT_LIMIT_PER_HOST = 10
+    DEFAULT_DNS_TTL = 300
+    DEFAULT_KEEPALIVE = 30
+
+    _instance: Optional["SessionManager"] = None
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        ttl_dns_cache: int = DEFAULT_DNS_TTL,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._httpx_clients: Dict[Tuple[Optional[str], bool], "httpx.AsyncClient"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+            "http2_responses": 0,
+        }
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "SessionManager":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @classmethod
+    async def close_instance(cls):
+        if cls._instance is not None:
+            await cls._instance.close()
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # session 与事件循环绑定，换了循环（如多次 asyncio.run）只能重建
+            self._session = None
+            self._httpx_clients = {}
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """返回共享 session，事件循环变化或已关闭时重新创建"""
+        self._bind_loop()
+        if self._session and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if not self._session or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.ttl_dns_cache,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    trace_configs=[self._build_trace_config()],
+                )
+        return self._session
+
+    async def get_httpx_client(self, proxy: Optional[str] = None, http2: bool = True) -> "httpx.AsyncClient":
+        """返回共享的 httpx 客户端；HTTP/2 下同一 host 的并发请求复用一条连接"""
+        self._bind_loop()
+        key = (proxy, http2)
+        client = self._httpx_clients.get(key)
+        if client is None or client.is_closed:
+            client = self._httpx_clients[key] = httpx.AsyncClient(
+                http2=http2,
+                proxy=proxy,
+                follow_redirects=True,
+                timeout=None,          # 超时由 RequestManager 统一控制
+                limits=httpx.Limits(
+                    max_connections=self.limit,
+                    max_keepalive_connections=self.limit_per_host,
+                    keepalive_expiry=self.keepalive_timeout,
+                ),
+                event_hooks={"response": [self._on_httpx_response]},
+            )
+        return client
+
+    async def _on_httpx_response(self, response):
+        self._stats["requests"] += 1
+        if response.http_version == "HTTP/2":
+            self._stats["http2_responses"] += 1
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        def counter(key):
+            async def _inc(session, ctx, params):
+                self._stats[key] += 1
+            return _inc
+
+        trace.on_request_start.append(counter("requests"))
+        trace.on_connection_create_end.append(counter("connections_created"))
+        trace.on_connection_reuseconn.append(counter("connections_reused"))
+        trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        used = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = round(stats["connections_reused"] / used, 4) if used else 0.0
+        return stats
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        clients, self._httpx_clients = self._httpx_clients, {}
+        for client in clients.values():
+            if not client.is_closed:
+                await client.aclose()
@@ -0,0 +1,257 @@
+# service/telemetry.py
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+LOGGER_ROOT = "novel"
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# ===========================================
+# 分级日志
+# ===========================================
+
+def get_logger(name: str) -> logging.Logger:
+    """模块日志器，统一挂在 novel.* 下；调试输出用 logger.debug("... %s", arg)，未开启时不做字符串格式化"""
+    return logging.getLogger(f"{LOGGER_ROOT}.{name}")
+
+
+def setup_logging(level: Optional[str] = None, fmt: str = "%(asctime)s %(levelname)-7s %(message)s"):
+    """
+    配置 novel.* 日志输出到 stdout；level 默认取环境变量 LOG_LEVEL（缺省 INFO）
+    多次调用只更新级别，不重复添加 handler
+    """
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    logger = logging.getLogger(LOGGER_ROOT)
+    logger.setLevel(level)
+    if not any(getattr(h, "_novel_handler", False) for h in logger.handlers):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(fmt, datefmt="%H:%M:%S"))
+        handler._novel_handler = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+# ===========================================
+# 指标与追踪
+# ===========================================
+
+class Histogram:
+    """累计分桶直方图（Prometheus 语义：le 为上界，含 +Inf）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """按分桶估算分位数（取所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += n
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class Span:
+    """一次计时区间：结束时写入 <name>_seconds 直方图，开启追踪时输出一行 JSON 事件"""
+    __slots__ = ("metrics", "name", "labels", "attrs", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, str], attrs: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.attrs = attrs
+        self.start = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.metrics.observe(f"{self.name}_seconds", elapsed, **self.labels)
+        self.metrics.trace(self.name, elapsed, **self.labels, **self.attrs)
+        return False
+
+
+class Metrics:
+    """
+    进程内指标注册表
+    - 计数器与直方图按 (指标名, 标签) 聚合，只在内存中累加，热路径上是一次字典查找
+    - span() 计时一个区间；设置 trace_path（或环境变量 TRACE_PATH）时每个区间结束写一行 JSON
+    - export() 按扩展名导出：.prom 为 Prometheus 文本格式，其余为一行 JSON 快照（追加写入）
+    - enabled=False（或环境变量 METRICS_ENABLED=0）时所有记录调用直接返回
+    """
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    SIZE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+    _instance: Optional["Metrics"] = None
+
+    def __init__(self, enabled: Optional[bool] = None, trace_path: Optional[str] = None):
+        if enabled is None:
+            enabled = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+        self.enabled = enabled
+        self.trace_path = trace_path or os.getenv("TRACE_PATH") or None
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        # 解析池的线程会并发写入，直方图更新加锁
+        self._lock = threading.Lock()
+        self._trace_file = None
+
+    @classmethod
+    def get_instance(cls, **kwargs) -> "Metrics":
+        """获取进程级单例，kwargs 仅在首次创建时生效"""
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    # ---------- 记录 ----------
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def register_buckets(self, name: str, buckets: Sequence[float]):
+        """为某个直方图指定分桶（需在第一次 observe 之前）"""
+        self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self._buckets.get(name, self.DEFAULT_BUCKETS))
+            hist.observe(value)
+
+    def span(self, name: str, labels: Optional[Dict[str, str]] = None, **attrs) -> Span:
+        """
+        计时区间，用法：with metrics.span("chapter", labels={"host": host}, url=url) as span: ...
+        labels 进入直方图标签（取值范围要小），attrs 只出现在追踪事件里
+        """
+        return Span(self, name, labels or {}, attrs)
+
+    def trace(self, name: str, duration: float, **attrs):
+        if not self.enabled or not self.trace_path:
+            return
+        event = {"ts": round(time.time(), 3), "span": name, "duration_ms": round(duration * 1000, 3), **attrs}
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._trace_file is None:
+                dirname = os.path.dirname(self.trace_path)
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
+                self._trace_file = open(self.trace_path, "a", encoding="utf-8", buffering=1)
+            self._trace_file.write(line)
+
+    # ---------- 查询与导出 ----------
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(self._key(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get(name, {}).get(self._key(labels))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前所有指标（直方图给出 count / sum / 估算 p50、p99）"""
+        counters = {
+            name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+            for name, series in self.counters.items()
+        }
+        histograms = {
+            name: [
+                {"labels": dict(key), "count": h.count, "sum": round(h.sum, 6),
+                 "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                for key, h in series.items()
+            ]
+            for name, series in self.histograms.items()
+        }
+        return {"ts": round(time.time(), 3), "counters": counters, "histograms": histograms}
+
+    @staticmethod
+    def _labels_text(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = key + extra
+        if not pairs:
+            return ""
+        escaped = (
+            k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for k, v in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                number = int(value) if float(value).is_integer() else value
+                lines.append(f"{name}{self._labels_text(key)} {number}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{self._labels_text(key, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{self._labels_text(key)} {h.sum:.6f}")
+                lines.append(f"{name}_count{self._labels_text(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """.prom 覆盖写 Prometheus 文本（供 node_exporter textfile 采集），其余追加一行 JSON 快照"""
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        if path.endswith(".prom"):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def close(self):
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
@@ -0,0 +1,181 @@
+# service/transport.py
+import asyncio
+import importlib.util
+import os
+from typing import Dict, Mapping, Optional
+
+import aiohttp
+
+from service.session_manager import SessionManager
+from service.telemetry import get_logger
+
+logger = get_logger("transport")
+
+try:
+    import httpx  # 可选依赖，HTTP/2 还需要 h2（pip install "httpx[http2]"）
+except ImportError:
+    httpx = None
+
+HAS_HTTP2 = httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+class TransportError(Exception):
+    """请求无法完成，且重试无意义（非法 URL、重定向过多、协议不支持等）；与某个 HTTP 状态码相关时记在 status 上"""
+
+    def __init__(self, message: str = "", status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TransportConnectionError(TransportError):
+    """连接、TLS 或协议层错误，可以重试"""
+
+
+class TransportResponse:
+    """传输层统一的响应：状态码、响应头（大小写不敏感的映射）、正文字节与协议版本"""
+    __slots__ = ("status", "headers", "content", "http_version")
+
+    def __init__(self, status: int, headers: Mapping[str, str], content: bytes, http_version: str):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.http_version = http_version
+
+
+class Transport:
+    """
+    传输层接口：只负责发出一次 GET 并返回 TransportResponse
+    - 任何状态码都正常返回，由 RequestManager 判定重试、缓存与熔断
+    - 超时抛 asyncio.TimeoutError，可重试的网络错误抛 TransportConnectionError，其余抛 TransportError
+    """
+    name = ""
+
+    async def fetch(self, url: str, headers: Dict[str, str], proxy: Optional[str] = None) -> TransportResponse:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(Transport):
+    """aiohttp（HTTP/1.1 keep-alive），默认传输层；有 SessionManager 时共用其连接池"""
+    name = "aiohttp"
+
+    def __init__(self, session_manager: Optional[SessionManager] = None):
+        self.session_manager = session_manager
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self.session_manager:
+            # 共享 session 由 SessionManager 负责创建和关闭
+            return await self.session_manager.get_session()
+        if not self._session or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def fetch(self, url: str, headers: Dict[str, str], proxy: Optional[str] = None) -> TransportResponse:
+        session = await self._get_session()
+        try:
+            async with session.get(url, headers=headers, proxy=proxy) as resp:
+                # 错误页与 304 的正文用不到，不读取
+                content = await resp.read() if 200 <= resp.status < 300 else b""
+                version = f"HTTP/{resp.version.major}.{resp.version.minor}" if resp.version else ""
+                return TransportResponse(resp.status, resp.headers, content, version)
+        except asyncio.TimeoutError:
+            raise
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+            raise TransportConnectionError(str(e) or e.__class__.__name__) from e
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e) or e.__class__.__name__) from e
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class HttpxTransport(Transport):
+    """
+    httpx 传输层，站点支持 HTTP/2 时同一 host 的章节请求在一条连接上多路复用
+    - 未安装 h2 时退回 HTTP/1.1
+    - 有 SessionManager 时客户端进程级共享（按代理区分），否则由本实例持有
+    """
+    name = "httpx"
+
+    def __init__(self, session_manager: Optional[SessionManager] = None, http2: bool = True):
+        if httpx is None:
+            raise TransportError("httpx 未安装，无法使用 httpx 传输层")
+        if http2 and not HAS_HTTP2:
+            logger.warning("未安装 h2，httpx 传输层退回 HTTP/1.1（pip install \"httpx[http2]\"）")
+            http2 = False
+        self.http2 = http2
+        self.session_manager = session_manager or SessionManager()
+        self._owns_manager = session_manager is None
+
+    async def fetch(self, url: str, headers: Dict[str, str], proxy: Optional[str] = None) -> TransportResponse:
+        client = await self.session_manager.get_httpx_client(proxy, self.http2)
+        try:
+            resp = await client.get(url, headers=headers)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.UnsupportedProtocol as e:
+            raise TransportError(str(e) or e.__class__.__name__) from e
+        except httpx.TransportError as e:
+            raise TransportConnectionError(str(e) or e.__class__.__name__) from e
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            raise TransportError(str(e) or e.__class__.__name__) from e
+        content = resp.content if 200 <= resp.status_code < 300 else b""
+        return TransportResponse(resp.status_code, resp.headers, content, resp.http_version)
+
+    async def close(self):
+        if self._owns_manager:
+            await self.session_manager.close()
+
+
+TRANSPORTS = {
+    AiohttpTransport.name: AiohttpTransport,
+    HttpxTransport.name: HttpxTransport,
+}
+
+
+class TransportSelector:
+    """
+    按 host 记录站点配置中的传输层（site.transport）
+    未配置的 host 使用环境变量 HTTP_TRANSPORT，缺省为 aiohttp；
+    选了 httpx 但未安装时退回 aiohttp
+    """
+    DEFAULT = "aiohttp"
+
+    _instance: Optional["TransportSelector"] = None
+
+    def __init__(self, default: Optional[str] = None):
+        self.default = self._validate(default or os.getenv("HTTP_TRANSPORT") or self.DEFAULT)
+        self._site_transports: Dict[str, str] = {}
+
+    @classmethod
+    def get_instance(cls) -> "TransportSelector":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def _validate(cls, name: str) -> str:
+        name = name.strip().lower()
+        if name not in TRANSPORTS:
+            raise ValueError(f"不支持的传输层: {name}（可选 {', '.join(TRANSPORTS)}）")
+        if name == HttpxTransport.name and httpx is None:
+            logger.warning("未安装 httpx，传输层退回 %s", cls.DEFAULT)
+            return cls.DEFAULT
+        return name
+
+    def configure(self, host: str, transport: Optional[str]):
+        """登记站点配置中的传输层"""
+        if transport:
+            self._site_transports[host.lower()] = self._validate(transport)
+
+    def get(self, host: str) -> str:
+        return self._site_transports.get(host.lower(), self.default)
+
+
+def create_transport(name: str, session_manager: Optional[SessionManager] = None) -> Transport:
+    return TRANSPORTS[name](session_manager=session_manager)
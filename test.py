@@ -1,4 +1,3 @@
-import json
 import os
 from dotenv import load_dotenv
 from parsel import Selector
@@ -6,11 +5,11 @@ from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from models.data_models import ChapterListConfig, XPathTemplate
 from service import novel_service
-from service.agent.generator_chapter_agent import XPathGeneratorChapterAgent
-from service.agent.generator_content_agent import XPathGeneratorContentAgent
-from service.agent.generator_novel_agent import XPathGeneratorNovelAgent
+from service.agent.rule_orchestrator import XPathRuleOrchestrator
 from service.config_service import ConfigService
 from service.crawl_service import CrawlService
+from service.rule_cache import RuleCache
+from service.rule_inducer import RuleInducer
 
 
 
@@ -66,24 +65,23 @@ if __name__ == "__main__":
     config_temple.site.user_agent = "Custom UA String"
     config_temple.site.delay = 1.0
 
-    # # 获取小说详情
-    print(f"✅ 小说详情页面xpath规则生成结果:")
-    generatorNovel = XPathGeneratorNovelAgent(model_name, model_key)
-    novel = generatorNovel.generate_rules(html=clean_chapter_html)
-
-    # 获取章节列表    
-    print(f"✅ 章节页面xpath规则生成结果:") 
-    generatorChapter = XPathGeneratorChapterAgent(model_name, model_key)
-    chapters = generatorChapter.generate_rules(html=clean_chapter_html)
-
-    # print(f"✅ 内容页面xpath规则生成结果:")    
-    generatorContent = XPathGeneratorContentAgent(model_name, model_key)
-    content = generatorContent.generate_rules(html=clean_content_html)
-
-    # 5. 覆盖 AI 生成的规则
-    config_temple.novel = json.loads(novel)
-    config_temple.chapters = json.loads(chapters)
-    config_temple.content = json.loads(content)
+    # 5. 三个 Agent 并发生成规则（带超时与重试），合并到模板中；结构相近的站点直接复用缓存规则，
+    #    目录与正文先尝试本地推断，置信度足够时不调用对应 Agent
+    print(f"✅ 并发生成小说详情、章节目录、正文的xpath规则:")
+    orchestrator = XPathRuleOrchestrator(
+        model_name, model_key,
+        rule_cache=RuleCache.get_instance(),
+        inducer=RuleInducer(),
+    )
+    config_temple = orchestrator.generate_sync(
+        config_temple,
+        chapter_html=clean_chapter_html,
+        content_html=clean_content_html,
+    )
+    if orchestrator.cache_hit:
+        print("✅ 命中规则缓存，未调用 LLM")
+    else:
+        print(f"本地推断: {orchestrator.induced}，各 Agent 用时: {orchestrator.timings}")
 
     print("✅ 最终合并的配置对象:")
     print(config_temple)